@@ -0,0 +1,32 @@
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Size of the thread pool shared by the async file nodes (EBU_IO_THREADS).
+DEFAULT_IO_THREADS = int(os.environ.get("EBU_IO_THREADS", "8"))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def io_executor() -> ThreadPoolExecutor:
+    """The process-wide pool for blocking file work, created on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=DEFAULT_IO_THREADS, thread_name_prefix="ebu-io")
+        return _executor
+
+
+async def run_io(func, *args, **kwargs):
+    """
+    Run a blocking call on the shared I/O pool and await its result,
+    leaving the event loop free meanwhile. The caller's context variables
+    (e.g. which node the metrics are attributed to) carry over to the thread.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(io_executor(), functools.partial(context.run, func, *args, **kwargs))
@@ -0,0 +1,77 @@
+"""
+Stand-ins and synthetic data for the benchmarks, so they run on a plain
+CPU-only Python without ComfyUI or torch.
+"""
+import importlib.util
+import os
+import random
+import struct
+import sys
+import zlib
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE_NAME = "ebu_workflow"
+
+
+def load_package():
+    """
+    Import this extension the way ComfyUI does (as a package, so its
+    relative imports resolve) and return its ``nodes`` module.
+    """
+    if PACKAGE_NAME not in sys.modules:
+        spec = importlib.util.spec_from_file_location(
+            PACKAGE_NAME, os.path.join(PACKAGE_DIR, "__init__.py"), submodule_search_locations=[PACKAGE_DIR]
+        )
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[PACKAGE_NAME] = module
+        spec.loader.exec_module(module)
+    return importlib.import_module(PACKAGE_NAME + ".nodes")
+
+
+class FakeImage:
+    """
+    Minimal IMAGE stand-in: a [B, H, W, C] batch that only carries its
+    shape. Indexing returns a single [H, W, C] image, like a torch tensor.
+    """
+
+    def __init__(self, batch_size: int, height: int, width: int, channels: int = 3):
+        self.shape = (batch_size, height, width, channels)
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, index):
+        if not -self.shape[0] <= index < self.shape[0]:
+            raise IndexError(index)
+        return _FakeFrame(self.shape[1:])
+
+
+class _FakeFrame:
+    def __init__(self, shape):
+        self.shape = shape
+
+
+def random_sizes(count: int, seed: int = 0, low: int = 256, high: int = 4096):
+    """count (width, height) pairs, multiples of 8, from a fixed seed."""
+    rng = random.Random(seed)
+    return [(rng.randrange(low, high, 8), rng.randrange(low, high, 8)) for _ in range(count)]
+
+
+def write_list_file(path: str, lines: int, seed: int = 0):
+    """A list-cache store of unique prompt-like lines."""
+    rng = random.Random(seed)
+    words = ["red", "blue", "castle", "forest", "portrait", "neon", "misty", "river", "golden", "storm"]
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(lines):
+            f.write(f"{i} {' '.join(rng.choice(words) for _ in range(6))}\n")
+
+
+def write_png_headers(directory: str, sizes):
+    """One header-only PNG per (width, height); enough for the header parser."""
+    os.makedirs(directory, exist_ok=True)
+    for i, (width, height) in enumerate(sizes):
+        ihdr = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+        chunk = struct.pack(">I", len(ihdr)) + b"IHDR" + ihdr + struct.pack(">I", zlib.crc32(b"IHDR" + ihdr))
+        with open(os.path.join(directory, f"{i:06d}.png"), "wb") as f:
+            f.write(b"\x89PNG\r\n\x1a\n" + chunk)
@@ -0,0 +1,483 @@
+"""
+CPU-only benchmarks for every node in nodes.py.
+
+    python benchmarks/run.py                      # full suite, table to stdout
+    python benchmarks/run.py --quick -o new.json  # smaller sizes, save results
+    python benchmarks/run.py --compare base.json  # fail on regressions vs. base.json
+    python benchmarks/run.py -k list_cache        # only matching benchmarks
+
+Each case times one operation (a node call, or a batch of calls described by
+its name) with timeit-style repeats and records the best and median seconds
+per operation. Results are written as JSON keyed by case name together with
+the git commit they were measured at, so runs from two commits can be
+compared with ``--compare``.
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fixtures import PACKAGE_DIR, FakeImage, load_package, random_sizes, write_list_file, write_png_headers  # noqa: E402
+
+RESULTS_SCHEMA = 1
+DEFAULT_THRESHOLD = 1.25
+
+BENCHMARKS = []
+
+
+def benchmark(name, sizes=(None,), quick_sizes=None):
+    """
+    Register ``func(nodes, tmp_dir, size) -> operation``. Setup happens in
+    func; only the returned zero-argument operation is timed. func returns
+    None to skip the case (e.g. when an optional dependency is missing).
+    """
+    def register(func):
+        BENCHMARKS.append((name, tuple(sizes), tuple(quick_sizes or sizes), func))
+        return func
+    return register
+
+
+# Resolution planners
+
+@benchmark("scaling_resolution/all_presets")
+def bench_scaling_resolution(nodes, tmp_dir, size):
+    node = nodes.EbuScalingResolution()
+    calls = []
+    for ratio, presets in nodes.EbuScalingResolution.aspect_ratios.items():
+        for preset in presets:
+            for mode in ("Landscape", "Profile"):
+                calls.append({"active_aspect_ratio": ratio, ratio: preset, "mode": mode, "upscale_by": 1.5})
+
+    def run():
+        for kwargs in calls:
+            node.compute_resolution(**kwargs)
+    return run
+
+
+@benchmark("scaling_resolution_sweep/every_preset")
+def bench_scaling_resolution_sweep(nodes, tmp_dir, size):
+    node = nodes.EbuScalingResolutionSweep()
+    plans = "* * Landscape 1.5\n* * Profile 2\nOther 1000x700 Landscape 1.25"
+    return lambda: node.compute_resolutions(plans)
+
+
+@benchmark("scaling_tile/sizes", sizes=(10_000,), quick_sizes=(1_000,))
+def bench_scaling_tile(nodes, tmp_dir, size):
+    node = nodes.EbuScalingTile()
+    dims = random_sizes(size, seed=1, high=8192)
+
+    def run():
+        for width, height in dims:
+            node.tile(width, height, 2.0, 3.0, 3.0, 2.0, 32, 32)
+    return run
+
+
+@benchmark("scaling_tile_plan/sizes", sizes=(1_000,), quick_sizes=(100,))
+def bench_scaling_tile_plan(nodes, tmp_dir, size):
+    node = nodes.EbuScalingTilePlan()
+    dims = random_sizes(size, seed=2, high=8192)
+
+    def run():
+        for width, height in dims:
+            node.plan(width, height, 1.0, 64, 32, 2.0)
+    return run
+
+
+# Image nodes
+
+@benchmark("aspect_ratio/single_images", sizes=(10_000,), quick_sizes=(1_000,))
+def bench_aspect_ratio(nodes, tmp_dir, size):
+    node = nodes.EbuGetImageAspectRatio()
+    from_image = nodes.EbuGetImageAspectRatioFromImage()
+    upscale = nodes.EbuComputeImageUpscale()
+    images = [FakeImage(1, height, width) for width, height in random_sizes(size, seed=3)]
+
+    def run():
+        for image in images:
+            node.get_aspect_ratio(image)
+            from_image.get_aspect_ratio_from_image(image, ":", 0.08)
+            upscale.compute_upscale(image, 2560, 1440)
+    return run
+
+
+@benchmark("aspect_ratio_batch/images", sizes=(10_000, 1_000_000), quick_sizes=(10_000,))
+def bench_aspect_ratio_batch(nodes, tmp_dir, size):
+    node = nodes.EbuGetImageAspectRatioBatch()
+    # One batch per distinct size, 10 images each
+    batches = [FakeImage(10, height, width) for width, height in random_sizes(size // 10, seed=4)]
+    return lambda: node.get_aspect_ratios(batches, [":"], [0.08])
+
+
+@benchmark("compute_upscale_batch/images", sizes=(10_000, 1_000_000), quick_sizes=(10_000,))
+def bench_compute_upscale_batch(nodes, tmp_dir, size):
+    node = nodes.EbuComputeImageUpscaleBatch()
+    batches = [FakeImage(10, height, width) for width, height in random_sizes(size // 10, seed=5)]
+    return lambda: node.compute_upscales(batches, [2560], [1440])
+
+
+@benchmark("aspect_ratio_index/warm", sizes=(2_000,), quick_sizes=(200,))
+def bench_aspect_ratio_index(nodes, tmp_dir, size):
+    node = nodes.EbuAspectRatioIndex()
+    image_dir = os.path.join(tmp_dir, "images")
+    write_png_headers(image_dir, random_sizes(size, seed=6))
+    index_dir = os.path.join(tmp_dir, "store")
+    node.index_aspect_ratios(image_dir, True, "", 0.08, index_dir, "index.json")
+    return lambda: node.index_aspect_ratios(image_dir, True, "16:9", 0.08, index_dir, "index.json")
+
+
+@benchmark("wait_for_image/passthrough")
+def bench_wait_for_image(nodes, tmp_dir, size):
+    nodes_and_inputs = [
+        (nodes.EbuStringWaitForImage(), "prompt"),
+        (nodes.EbuImageWaitForImage(), FakeImage(1, 512, 512)),
+        (nodes.EbuModelWaitForImage(), object()),
+    ]
+    image = FakeImage(1, 512, 512)
+    barrier = nodes.EbuWaitFor()
+
+    def run():
+        for node, value in nodes_and_inputs:
+            node.passthrough(value, image)
+        barrier.check_lazy_status("all", value=None, gate_1=image, gate_2=image)
+        barrier.wait("all", value="prompt", gate_1=image, gate_2=image)
+    return run
+
+
+@benchmark("upscale_image_chunked/1080p_to_4k", sizes=(4,), quick_sizes=(1,))
+def bench_upscale_chunked(nodes, tmp_dir, size):
+    """Needs torch; skipped without it."""
+    try:
+        import torch
+    except ImportError:
+        return None
+    node = nodes.EbuUpscaleImageChunked()
+    images = torch.rand(size, 1080, 1920, 3)
+    return lambda: node.upscale(images, 3840, 2160, "bilinear", 1, 512, "float32", 0)
+
+
+# Strings
+
+@benchmark("unique_file_name/calls", sizes=(1_000,))
+def bench_unique_file_name(nodes, tmp_dir, size):
+    node = nodes.EbuUniqueFileName()
+
+    def run():
+        for i in range(size):
+            node.generate_filename("image", "-", i)
+    return run
+
+
+@benchmark("new_lines/encode_decode_mb", sizes=(1, 32), quick_sizes=(1,))
+def bench_new_lines(nodes, tmp_dir, size):
+    encode, decode = nodes.EbuEncodeNewLines(), nodes.EbuDecodeNewLines()
+    text = ("a castle in the misty forest, golden hour\n" * (size * 1024 * 1024 // 42))
+
+    def run():
+        decode.decode(encode.encode(text, "|")[0], "|")
+    return run
+
+
+@benchmark("new_lines_batch/escaped_texts", sizes=(10_000, 100_000), quick_sizes=(10_000,))
+def bench_new_lines_batch(nodes, tmp_dir, size):
+    encode, decode = nodes.EbuEncodeNewLinesBatch(), nodes.EbuDecodeNewLinesBatch()
+    texts = [f"prompt {i}\na castle | in the forest\\n\ngolden hour" for i in range(size)]
+
+    def run():
+        decode.decode(encode.encode(texts, ["|"], [True])[0], ["|"], [True])
+    return run
+
+
+@benchmark("encode_file_to_store/records", sizes=(100_000,), quick_sizes=(10_000,))
+def bench_encode_file_to_store(nodes, tmp_dir, size):
+    node = nodes.EbuEncodeFileToStore()
+    source = os.path.join(tmp_dir, "records.txt")
+    with open(source, "w", encoding="utf-8") as f:
+        for i in range(size):
+            f.write(f"record {i}\nsecond line of {i}\n\n")
+    directory = os.path.join(tmp_dir, "encoded")
+    counter = iter(range(1_000_000))
+
+    def run():
+        node.encode_file(source, directory, f"store_{next(counter)}.txt", "|||", "\\n\\n", True)
+    return run
+
+
+# Store files
+
+@benchmark("append_to_file/lines", sizes=(1_000,), quick_sizes=(200,))
+def bench_append(nodes, tmp_dir, size):
+    node = nodes.EbuAppendToFile()
+    directory = os.path.join(tmp_dir, "append")
+    return lambda: [node.append_to_file(f"line {i}", directory, "log.txt", False) for i in range(size)]
+
+
+@benchmark("append_to_file_buffered/lines", sizes=(10_000,), quick_sizes=(1_000,))
+def bench_append_buffered(nodes, tmp_dir, size):
+    node = nodes.EbuAppendToFile()
+    directory = os.path.join(tmp_dir, "append_buffered")
+    writer = sys.modules[nodes.__package__ + ".file_writer"].shared_writer
+
+    def run():
+        for i in range(size):
+            node.append_to_file(f"line {i}", directory, "log.txt", False, buffered=True)
+        writer.flush()
+    return run
+
+
+def _read_fixture(tmp_dir, lines):
+    directory = os.path.join(tmp_dir, "read")
+    file_name = f"log_{lines}.txt"
+    path = os.path.join(directory, file_name)
+    if not os.path.exists(path):
+        write_list_file(path, lines, seed=7)
+    return directory, file_name
+
+
+@benchmark("read_from_file/whole_cached", sizes=(100_000,), quick_sizes=(10_000,))
+def bench_read_whole(nodes, tmp_dir, size):
+    node = nodes.EbuReadFromFile()
+    directory, file_name = _read_fixture(tmp_dir, size)
+    return lambda: node.read_from_file(directory, file_name)
+
+
+@benchmark("read_from_file/last_lines", sizes=(100_000, 1_000_000), quick_sizes=(10_000,))
+def bench_read_last_lines(nodes, tmp_dir, size):
+    node = nodes.EbuReadFromFile()
+    directory, file_name = _read_fixture(tmp_dir, size)
+    return lambda: node.read_from_file(directory, file_name, read_mode="last lines", line_count=20)
+
+
+@benchmark("read_from_file/after_append", sizes=(100_000, 1_000_000), quick_sizes=(10_000,))
+def bench_read_after_append(nodes, tmp_dir, size):
+    """Append one line then read the tail: the write-then-read loop of a running queue."""
+    reader, writer = nodes.EbuReadFromFile(), nodes.EbuAppendToFile()
+    directory, file_name = _read_fixture(tmp_dir, size)
+
+    def run():
+        writer.append_to_file("another line", directory, file_name, False)
+        reader.read_from_file(directory, file_name, read_mode="last lines", line_count=20)
+    return run
+
+
+@benchmark("read_from_file_async/8_concurrent", sizes=(100_000,), quick_sizes=(10_000,))
+def bench_read_async(nodes, tmp_dir, size):
+    node = nodes.EbuReadFromFileAsync()
+    directory, file_name = _read_fixture(tmp_dir, size)
+
+    async def read_all():
+        await asyncio.gather(*(node.read_from_file_async(directory_name=directory, file_name=file_name,
+                                                         read_mode="random line", seed=i) for i in range(8)))
+    return lambda: asyncio.run(read_all())
+
+
+@benchmark("file_list_cache/sample", sizes=(1_000, 100_000, 1_000_000), quick_sizes=(1_000, 100_000))
+def bench_list_cache_sample(nodes, tmp_dir, size):
+    node = nodes.EbuFileListCache()
+    directory = os.path.join(tmp_dir, "list")
+    file_name = f"sample_{size}.txt"
+    write_list_file(os.path.join(directory, file_name), size, seed=8)
+    seeds = iter(range(1 << 62))
+    return lambda: node.process_file_list_cache(directory, file_name, 5, "", size, next(seeds))
+
+
+@benchmark("file_list_cache/cursor", sizes=(1_000, 100_000, 1_000_000), quick_sizes=(1_000, 100_000))
+def bench_list_cache_cursor(nodes, tmp_dir, size):
+    node = nodes.EbuFileListCache()
+    directory = os.path.join(tmp_dir, "list")
+    file_name = f"cursor_{size}.txt"
+    write_list_file(os.path.join(directory, file_name), size, seed=8)
+    return lambda: node.process_file_list_cache(directory, file_name, 5, "", size, 0, "cursor")
+
+
+@benchmark("file_list_cache/after_other_worker", sizes=(100_000, 1_000_000), quick_sizes=(100_000,))
+def bench_list_cache_after_other_worker(nodes, tmp_dir, size):
+    """Sample from a cached pool right after another worker appended 10 lines to it."""
+    file_store = importlib.import_module(nodes.__package__ + ".file_store")
+    node = nodes.EbuFileListCache()
+    directory = os.path.join(tmp_dir, "list")
+    file_name = f"other_worker_{size}.txt"
+    path = os.path.join(directory, file_name)
+    write_list_file(path, size, seed=11)
+    # Stands in for the other worker's own cached copy of the index
+    other = file_store.ListStore(path).load()
+    counter = iter(range(1 << 62))
+
+    def run():
+        i = next(counter)
+        other.extend([f"other worker item {i} {j}" for j in range(10)])
+        node.process_file_list_cache(directory, file_name, 5, "", size * 2, i)
+    return run
+
+
+@benchmark("file_list_cache/merge", sizes=(1_000, 100_000, 1_000_000), quick_sizes=(1_000, 100_000))
+def bench_list_cache_merge(nodes, tmp_dir, size):
+    """Merge 10 new items per call into a full pool, compacting it as it overflows."""
+    node = nodes.EbuFileListCache()
+    directory = os.path.join(tmp_dir, "list")
+    file_name = f"merge_{size}.txt"
+    write_list_file(os.path.join(directory, file_name), size, seed=9)
+    rng = random.Random(10)
+    counter = iter(range(1 << 62))
+
+    def run():
+        items = "\n".join(f"new item {next(counter)} {rng.random()}" for _ in range(10))
+        node.process_file_list_cache(directory, file_name, 5, items, size, rng.randrange(1 << 32))
+    return run
+
+
+@benchmark("file_list_cache_database/sample", sizes=(1_000, 100_000), quick_sizes=(1_000,))
+def bench_list_cache_database_sample(nodes, tmp_dir, size):
+    node = nodes.EbuFileListCache()
+    directory = os.path.join(tmp_dir, "list_db")
+    file_name = f"sample_{size}.txt"
+    write_list_file(os.path.join(directory, file_name), size, seed=8)
+    nodes.EbuListDatabase().run(directory, "import text files", file_name)
+    seeds = iter(range(1 << 62))
+    return lambda: node.process_file_list_cache(directory, file_name, 5, "", size, next(seeds), "random", "database")
+
+
+@benchmark("file_list_cache_database/merge", sizes=(1_000, 100_000), quick_sizes=(1_000,))
+def bench_list_cache_database_merge(nodes, tmp_dir, size):
+    """As file_list_cache/merge, with the pool kept in lists.sqlite."""
+    node = nodes.EbuFileListCache()
+    directory = os.path.join(tmp_dir, "list_db")
+    file_name = f"merge_{size}.txt"
+    write_list_file(os.path.join(directory, file_name), size, seed=9)
+    nodes.EbuListDatabase().run(directory, "import text files", file_name)
+    rng = random.Random(10)
+    counter = iter(range(1 << 62))
+
+    def run():
+        items = "\n".join(f"new item {next(counter)} {rng.random()}" for _ in range(10))
+        node.process_file_list_cache(directory, file_name, 5, items, size, rng.randrange(1 << 32), "random", "database")
+    return run
+
+
+@benchmark("list_database_sample/lists", sizes=(10, 50), quick_sizes=(10,))
+def bench_list_database_sample(nodes, tmp_dir, size):
+    """One item from each of size wildcard-style lists of 1,000 items, in one transaction."""
+    node = nodes.EbuListDatabaseSample()
+    directory = os.path.join(tmp_dir, f"wildcards_{size}")
+    names = [f"wildcard_{i}.txt" for i in range(size)]
+    for i, name in enumerate(names):
+        write_list_file(os.path.join(directory, name), 1_000, seed=i)
+    nodes.EbuListDatabase().run(directory, "import text files", "")
+    seeds = iter(range(1 << 62))
+    return lambda: node.sample(directory, "\n".join(names), 1, next(seeds))
+
+
+# Runner
+
+def time_operation(operation, repeat, min_seconds):
+    """Best and median seconds per call, calibrating calls per repeat to min_seconds."""
+    operation()  # warm up: first-call index builds and caches aren't what we measure
+    start = time.perf_counter()
+    operation()
+    first = time.perf_counter() - start
+    number = max(1, int(min_seconds / first)) if first > 0 else 1000
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            operation()
+        timings.append((time.perf_counter() - start) / number)
+    return {"number": number, "repeat": repeat, "min": min(timings), "median": statistics.median(timings)}
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=PACKAGE_DIR, capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=PACKAGE_DIR,
+                                    capture_output=True, text=True, check=True).stdout.strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+
+def run_suite(quick=False, pattern=None, repeat=5, min_seconds=0.05):
+    nodes = load_package()
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="ebu-bench-") as tmp_dir:
+        for name, sizes, quick_sizes, func in BENCHMARKS:
+            for size in (quick_sizes if quick else sizes):
+                key = name if size is None else f"{name}[{size}]"
+                if pattern and pattern not in key:
+                    continue
+                operation = func(nodes, tmp_dir, size)
+                if operation is None:
+                    print(f"{key:<55} skipped", flush=True)
+                    continue
+                result = time_operation(operation, repeat, min_seconds)
+                result["size"] = size
+                results[key] = result
+                print(f"{key:<55} {result['median'] * 1e3:12.4f} ms  (min {result['min'] * 1e3:.4f} ms, n={result['number']})",
+                      flush=True)
+    commit, dirty = git_commit()
+    return {
+        "schema": RESULTS_SCHEMA,
+        "commit": commit,
+        "dirty": dirty,
+        "created": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "quick": quick,
+        "results": results,
+    }
+
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """Print median ratios current/baseline; returns the keys slower than threshold."""
+    regressions = []
+    print(f"\nvs. {(baseline.get('commit') or 'baseline')[:12]}")
+    for key, result in current["results"].items():
+        base = baseline["results"].get(key)
+        if base is None:
+            continue
+        ratio = result["median"] / base["median"] if base["median"] else float("inf")
+        flag = ""
+        if ratio > threshold:
+            flag = "  REGRESSION"
+            regressions.append(key)
+        elif ratio < 1 / threshold:
+            flag = "  faster"
+        print(f"{key:<55} {ratio:8.2f}x{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quick", action="store_true", help="smaller sizes, for a fast check")
+    parser.add_argument("-k", dest="pattern", help="only run cases whose name contains this")
+    parser.add_argument("-o", "--output", help="write results JSON here")
+    parser.add_argument("--compare", help="results JSON from another run to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help=f"median slowdown ratio counted as a regression (default {DEFAULT_THRESHOLD})")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-seconds", type=float, default=0.05, help="minimum time per repeat")
+    args = parser.parse_args(argv)
+
+    report = run_suite(args.quick, args.pattern, args.repeat, args.min_seconds)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(baseline, report, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
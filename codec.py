@@ -0,0 +1,125 @@
+import functools
+import os
+import re
+from typing import Iterable, Iterator, List
+
+from .file_lock import locked
+from .file_store import ListStore
+
+ESCAPE = "\\"
+
+# Characters other than "\n" that str.splitlines() treats as line breaks. The
+# escaped encoding writes them as \uXXXX so an encoded text is always one line.
+_OTHER_LINE_BREAKS = "\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029"
+
+STREAM_CHUNK_CHARS = 1 << 20
+STREAM_BATCH_ITEMS = 10_000
+
+
+@functools.lru_cache(maxsize=64)
+def _patterns(token: str):
+    if not token:
+        raise ValueError("new_line_encoding must not be empty")
+    lead = token[0]
+    # The decoder reads ESCAPE + ESCAPE, ESCAPE + lead and ESCAPE + "u" as
+    # escapes, so the token must not be one of them, nor a prefix of one.
+    if token == ESCAPE or (lead == ESCAPE and token[1:2] in (ESCAPE, "u")):
+        raise ValueError(f"new_line_encoding can't be {ESCAPE!r} or start with {ESCAPE + ESCAPE!r} or {ESCAPE + 'u'!r}")
+    if lead == "u":
+        raise ValueError("new_line_encoding can't start with 'u', which would clash with \\uXXXX escapes")
+    specials = {"\n", ESCAPE, lead, *_OTHER_LINE_BREAKS}
+    encode = re.compile("|".join(re.escape(c) for c in sorted(specials)))
+    decode = re.compile(
+        re.escape(ESCAPE) + "(?:(" + re.escape(ESCAPE) + "|" + re.escape(lead) + ")|u([0-9a-fA-F]{4}))|" + re.escape(token)
+    )
+    return encode, decode
+
+
+def escape_newlines(text: str, token: str) -> str:
+    """
+    Encode text as a single line, reversibly: newlines become token, and
+    the escape character, the token's first character and any other line
+    break character are escaped, so no literal text can be mistaken for
+    a newline when decoding.
+    """
+    encode, _ = _patterns(token)
+    lead = token[0]
+
+    def replace(match):
+        c = match.group()
+        if c == "\n":
+            return token
+        if c == ESCAPE or c == lead:
+            return ESCAPE + c
+        return f"{ESCAPE}u{ord(c):04x}"
+
+    return encode.sub(replace, text)
+
+
+def unescape_newlines(encoded: str, token: str) -> str:
+    """Exact inverse of escape_newlines, in one pass."""
+    _, decode = _patterns(token)
+
+    def replace(match):
+        if match.group(1) is not None:
+            return match.group(1)
+        if match.group(2) is not None:
+            return chr(int(match.group(2), 16))
+        return "\n"
+
+    return decode.sub(replace, encoded)
+
+
+def encode_newlines(texts: Iterable[str], token: str, escaped: bool = True) -> List[str]:
+    if escaped:
+        return [escape_newlines(text, token) for text in texts]
+    return [text.replace("\n", token) for text in texts]
+
+
+def decode_newlines(texts: Iterable[str], token: str, escaped: bool = True) -> List[str]:
+    if escaped:
+        return [unescape_newlines(text, token) for text in texts]
+    return [text.replace(token, "\n") for text in texts]
+
+
+def iter_records(f, separator: str, chunk_chars: int = STREAM_CHUNK_CHARS) -> Iterator[str]:
+    """
+    Split a text stream into records on separator, reading chunk_chars at a
+    time, so memory holds one chunk plus the record being assembled.
+    Empty records (e.g. from repeated separators) are skipped.
+    """
+    pending = ""
+    while True:
+        chunk = f.read(chunk_chars)
+        if not chunk:
+            break
+        pending += chunk
+        records = pending.split(separator)
+        pending = records.pop()
+        for record in records:
+            if record.strip():
+                yield record
+    if pending.strip():
+        yield pending
+
+
+def encode_file_to_store(source_path: str, store_path: str, token: str, separator: str = "\n\n",
+                         escaped: bool = True) -> int:
+    """
+    Stream source_path, split into records on separator, into the ListStore
+    at store_path with one encoded record per line. Records the store
+    already has are skipped. Returns how many were added.
+    """
+    os.makedirs(os.path.dirname(store_path) or ".", exist_ok=True)
+    added = 0
+    with open(source_path, "r", encoding="utf-8") as f, locked(store_path):
+        store = ListStore(store_path).load()
+        batch = []
+        for record in iter_records(f, separator):
+            batch.append(encode_newlines([record.strip()], token, escaped)[0])
+            if len(batch) >= STREAM_BATCH_ITEMS:
+                added += len(store.extend(batch))
+                batch = []
+        if batch:
+            added += len(store.extend(batch))
+    return added
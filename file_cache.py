@@ -0,0 +1,173 @@
+import hashlib
+import os
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+from . import instrumentation
+
+# Default budget for the shared cache, overridable with EBU_FILE_CACHE_MB.
+DEFAULT_MAX_BYTES = int(float(os.environ.get("EBU_FILE_CACHE_MB", "64")) * 1024 * 1024)
+
+
+# How many bytes before an indexed size are hashed to tell an append from a rewrite
+TAIL_CHECK_BYTES = 64
+
+UNCHANGED, APPENDED, REWRITTEN = "unchanged", "appended", "rewritten"
+
+
+def file_signature(path: str):
+    """(mtime_ns, size, inode) of a file; raises FileNotFoundError if it is missing."""
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def tail_digest(data, size: int) -> bytes:
+    """Digest of the TAIL_CHECK_BYTES bytes before size in data (bytes or an mmap)."""
+    return hashlib.blake2b(data[max(0, size - TAIL_CHECK_BYTES):size], digest_size=8).digest()
+
+
+def read_tail_digest(path: str, size: int) -> bytes:
+    """tail_digest of a file's first size bytes, reading only the bytes it hashes."""
+    start = max(0, size - TAIL_CHECK_BYTES)
+    with open(path, "rb") as f:
+        f.seek(start)
+        return tail_digest(f.read(size - start), size - start)
+
+
+def file_change(path: str, st, inode: int, size: int, mtime_ns: int, tail: bytes) -> str:
+    """
+    How the file at path (as stat'ed in st) relates to the state an index
+    of it recorded (its inode, size, mtime_ns and tail digest): UNCHANGED;
+    APPENDED if it is the same file, now longer, with the bytes before the
+    old size as they were; or REWRITTEN for anything else, including a
+    same-size rewrite. Used by the persistent sidecar indexes so they only
+    scan what was appended and rebuild after any other change.
+    """
+    if (st.st_ino, st.st_size, st.st_mtime_ns) == (inode, size, mtime_ns):
+        return UNCHANGED
+    if st.st_ino == inode and size < st.st_size and read_tail_digest(path, size) == tail:
+        return APPENDED
+    return REWRITTEN
+
+
+class FileCache:
+    """
+    In-process cache of values parsed from files, keyed by resolved path and
+    by ``kind`` (what was parsed out of the file: its text, a list index, ...).
+
+    An entry is only served while the file's (mtime_ns, size, inode) still
+    matches what it was when the entry was stored, so edits from other
+    processes are picked up on the next lookup. Writers in this process
+    call ``invalidate`` (or ``put`` with the fresh value) after writing,
+    which also covers same-size rewrites within one mtime tick. Entries are
+    evicted least-recently-used once their total size exceeds ``max_bytes``.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(path: str) -> str:
+        return os.path.realpath(path)
+
+    def get_or_load(self, path: str, kind: str, loader: Callable[[], Any], sizeof: Callable[[Any], int] = sys.getsizeof,
+                    refresher: Optional[Callable[[Any], Any]] = None) -> Any:
+        """
+        Return the cached ``kind`` value for path, calling ``loader()`` to
+        (re)build it when the file changed since it was cached. With a
+        ``refresher``, a cached value for the old file is instead passed to
+        ``refresher(value)``, which brings it up to date (e.g. by reading
+        only what was appended) and returns it.
+        """
+        real_path = self.key(path)
+        signature = file_signature(real_path)
+        key = (real_path, kind)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == signature:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                instrumentation.add("cache_hits")
+                return entry[1]
+            self.misses += 1
+        instrumentation.add("cache_misses")
+
+        if entry is None or refresher is None:
+            value = loader()
+        else:
+            try:
+                value = refresher(entry[1])
+            except BaseException:
+                # It may have been left half updated
+                self.invalidate(path)
+                raise
+        self._store(key, signature, value, sizeof(value))
+        return value
+
+    def put(self, path: str, kind: str, value: Any, nbytes: Optional[int] = None):
+        """Cache value for path against the file's current signature."""
+        real_path = self.key(path)
+        try:
+            signature = file_signature(real_path)
+        except FileNotFoundError:
+            self.invalidate(path)
+            return
+        key = (real_path, kind)
+        self._store(key, signature, value, sys.getsizeof(value) if nbytes is None else nbytes)
+
+    def invalidate(self, path: str):
+        """Drop every value cached for path."""
+        real_path = self.key(path)
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == real_path]:
+                self.total_bytes -= self._entries.pop(key)[2]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+    def set_max_bytes(self, max_bytes: int):
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def _store(self, key, signature, value, nbytes):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.total_bytes -= old[2]
+            if nbytes > self.max_bytes:
+                return
+            self._entries[key] = (signature, value, nbytes)
+            self.total_bytes += nbytes
+            self._evict()
+
+    def _evict(self):
+        while self.total_bytes > self.max_bytes and self._entries:
+            _, (_, _, nbytes) = self._entries.popitem(last=False)
+            self.total_bytes -= nbytes
+            self.evictions += 1
+
+
+# Shared by every file node in this process.
+shared_cache = FileCache()
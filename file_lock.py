@@ -0,0 +1,160 @@
+import os
+import shutil
+import stat
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from . import instrumentation
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    try:
+        import msvcrt
+    except ImportError:
+        msvcrt = None
+
+LOCK_SUFFIX = ".lock"
+
+# How long to wait for another worker's lock before giving up (EBU_LOCK_TIMEOUT).
+DEFAULT_LOCK_TIMEOUT = float(os.environ.get("EBU_LOCK_TIMEOUT", "30"))
+
+
+class LockStats:
+    """Contention counters for the store locks, shared across threads."""
+
+    def __init__(self):
+        self.acquisitions = 0
+        self.contended = 0
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, waited: float, contended: bool, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.acquisitions += 1
+            if contended:
+                self.contended += 1
+                self.wait_seconds += waited
+                self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                "acquisitions": self.acquisitions,
+                "contended": self.contended,
+                "timeouts": self.timeouts,
+                "wait_seconds": self.wait_seconds,
+                "max_wait_seconds": self.max_wait_seconds,
+            }
+
+
+lock_stats = LockStats()
+
+
+def _try_lock(fd: int, exclusive: bool) -> bool:
+    if fcntl is not None:
+        try:
+            fcntl.flock(fd, (fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH) | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            return False
+    if msvcrt is not None:
+        # msvcrt has no shared locks; every lock is exclusive.
+        try:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            return False
+    return True
+
+
+def _unlock(fd: int):
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    elif msvcrt is not None:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def locked(path: str, exclusive: bool = True, timeout: float = None):
+    """
+    Hold an advisory lock for ``path`` across processes.
+
+    The lock is taken on a ``.lock`` sidecar rather than the file itself, so
+    it survives the file being swapped out by ``atomic_write``. Readers take
+    it shared and writers exclusive. Waits are bounded by ``timeout``
+    (EBU_LOCK_TIMEOUT seconds by default), after which TimeoutError is raised.
+    """
+    if timeout is None:
+        timeout = DEFAULT_LOCK_TIMEOUT
+    fd = os.open(path + LOCK_SUFFIX, os.O_RDWR | os.O_CREAT, 0o666)
+    try:
+        start = time.monotonic()
+        contended = False
+        delay = 0.001
+        while not _try_lock(fd, exclusive):
+            contended = True
+            waited = time.monotonic() - start
+            if waited >= timeout:
+                lock_stats.record(waited, contended, timed_out=True)
+                raise TimeoutError(f"Timed out after {timeout}s waiting for lock on {path}")
+            time.sleep(min(delay, timeout - waited))
+            delay = min(delay * 2, 0.05)
+        lock_stats.record(time.monotonic() - start, contended)
+        try:
+            yield
+        finally:
+            _unlock(fd)
+    finally:
+        os.close(fd)
+
+
+def atomic_write(path: str, data: bytes, backup_path: str = None):
+    """
+    Replace ``path`` with ``data`` so readers only ever see the old or the
+    new contents. If ``backup_path`` is given the old file is kept there,
+    hard-linked where the filesystem allows it instead of copied.
+    """
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix="." + os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        instrumentation.add("bytes_written", len(data))
+        # mkstemp creates 0600; keep the permissions of the file being replaced
+        try:
+            mode = stat.S_IMODE(os.stat(path).st_mode)
+        except FileNotFoundError:
+            mode = 0o644
+        os.chmod(tmp_path, mode)
+        if backup_path is not None and os.path.exists(path):
+            _backup(path, backup_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def _backup(path: str, backup_path: str):
+    try:
+        os.unlink(backup_path)
+    except FileNotFoundError:
+        pass
+    try:
+        os.link(path, backup_path)
+    except OSError:
+        shutil.copy2(path, backup_path)
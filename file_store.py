@@ -0,0 +1,499 @@
+import bisect
+import hashlib
+import os
+import random
+import struct
+import threading
+from array import array
+from typing import Collection, Iterable, Iterator, List
+
+from . import instrumentation
+from .file_cache import APPENDED, UNCHANGED, file_change, read_tail_digest
+from .file_lock import atomic_write, locked
+
+INDEX_SUFFIX = ".idx"
+BACKUP_SUFFIX = ".bk"
+CURSOR_SUFFIX = ".cursor"
+
+# Fraction of limit_list_size the pool may grow past before it is compacted
+# back down. Compaction is the only time the text file is rewritten.
+COMPACTION_SLACK = 0.25
+
+# Read-only sampling streams pools larger than this (EBU_LIST_STREAM_MB)
+# instead of building an index for them.
+STREAM_SAMPLE_BYTES = int(float(os.environ.get("EBU_LIST_STREAM_MB", "256")) * 1024 * 1024)
+
+_INDEX_MAGIC = b"EBULIDX2"
+# magic, indexed file inode, size, mtime_ns, digest of the indexed tail (see file_change), entry count
+_INDEX_HEADER = struct.Struct("<8sQQq8sQ")
+# Up to this many new hashes are inserted into the sorted array one by one;
+# more than that and re-sorting the whole array is cheaper.
+_INSORT_MAX = 256
+# byte offset of the line in the text file, hash of the stripped line
+_INDEX_RECORD = struct.Struct("<QQ")
+
+_CURSOR_MAGIC = b"EBUCUR01"
+# magic, inode of the text file the order was drawn for, seed, cycle, next position, order length
+_CURSOR_HEADER = struct.Struct("<8sQQQQQ")
+# one store position per slot of the draw order
+_CURSOR_SLOT = struct.Struct("<I")
+
+
+def item_hash(item: str) -> int:
+    """64-bit content hash of a stripped list item."""
+    return int.from_bytes(hashlib.blake2b(item.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def lazy_shuffle(n: int, rng) -> Iterator[int]:
+    """
+    Yield the positions 0..n-1 in random order, one ``rng.randrange`` call
+    each. This is a lazy Fisher-Yates shuffle: only the swapped slots are
+    kept in a dict, so taking the first k costs O(k) time and memory
+    instead of copying and shuffling the whole range.
+    """
+    swapped = {}
+    for i in range(n):
+        j = rng.randrange(i, n)
+        chosen = swapped.get(j, j)
+        swapped[j] = swapped.get(i, i)
+        yield chosen
+
+
+def compaction_due(count: int, limit: int) -> bool:
+    """True once a pool of count items has outgrown limit by more than COMPACTION_SLACK."""
+    return count > limit + max(1, int(limit * COMPACTION_SLACK))
+
+
+class ListStore:
+    """
+    A one-item-per-line text file with a persistent hash index next to it.
+
+    The text file keeps the plain format EbuFileListCache has always written.
+    The ``.idx`` sidecar records the byte offset and content hash of every
+    live line, so dedup checks and appends never need to re-read the text
+    file, and single items can be fetched by seeking to their offset.
+
+    In memory everything lives in flat ``array('Q')`` buffers (offsets, hashes
+    in line order, and a sorted copy of the hashes for bisect lookups), about
+    24 bytes per line regardless of how long the lines are.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.index_path = path + INDEX_SUFFIX
+        self.backup_path = path + BACKUP_SUFFIX
+        # Held while the index is refreshed in place, so readers sharing a
+        # cached store in this process never see it half updated.
+        self.lock = threading.RLock()
+        self._reset()
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __contains__(self, item: str):
+        return self.has_hash(item_hash(item))
+
+    def has_hash(self, h: int) -> bool:
+        i = bisect.bisect_left(self.sorted_hashes, h)
+        return i < len(self.sorted_hashes) and self.sorted_hashes[i] == h
+
+    def nbytes(self) -> int:
+        """In-memory footprint, used as the file cache's size estimate."""
+        return sum(a.itemsize * len(a) for a in (self.offsets, self.hashes, self.sorted_hashes))
+
+    # Loading
+
+    def load(self) -> "ListStore":
+        """Load the index from the sidecar, extending or rebuilding it if the text file changed."""
+        self._reset()
+        if os.path.exists(self.path):
+            self._read_index()
+        return self.refresh()
+
+    def refresh(self) -> "ListStore":
+        """
+        Bring the index up to date with the text file. Nothing is read if it
+        is unchanged. If it is the same file (inode) with lines appended, and
+        the bytes just before the indexed size still hash the same, only the
+        new tail is scanned. Anything else (a rewrite, a replaced file)
+        rebuilds the index from scratch.
+        """
+        with self.lock:
+            try:
+                st = os.stat(self.path)
+            except FileNotFoundError:
+                self._reset()
+                return self
+            change = file_change(self.path, st, self.inode, self.size, self.mtime_ns, self.tail)
+            if change == UNCHANGED:
+                return self
+
+            indexed = self._indexed()
+            # Only whole lines may have been appended, or the last indexed line changed
+            if change != APPENDED or not self._is_line_boundary(self.size):
+                self._reset()
+                indexed = None
+            self._scan(self.size)
+            self._write_index(indexed)
+        return self
+
+    def _reset(self):
+        self.offsets = array("Q")
+        self.hashes = array("Q")
+        self.sorted_hashes = array("Q")
+        self.inode = 0
+        self.size = 0
+        self.mtime_ns = 0
+        self.tail = b""
+        self.ends_with_newline = True
+
+    def _read_index(self):
+        try:
+            with open(self.index_path, "rb") as f:
+                raw = f.read()
+        except FileNotFoundError:
+            return
+        if len(raw) < _INDEX_HEADER.size:
+            return
+        magic, inode, size, mtime_ns, tail, count = _INDEX_HEADER.unpack_from(raw)
+        if magic != _INDEX_MAGIC or len(raw) != _INDEX_HEADER.size + count * _INDEX_RECORD.size:
+            return
+
+        records = array("Q", raw[_INDEX_HEADER.size:])
+        if records.itemsize != 8:
+            return
+        self.offsets = records[0::2]
+        self.hashes = records[1::2]
+        self.sorted_hashes = array("Q", sorted(self.hashes))
+        self.inode, self.size, self.mtime_ns, self.tail = inode, size, mtime_ns, tail
+        self.ends_with_newline = self._is_line_boundary(size)
+
+    def _is_line_boundary(self, position: int) -> bool:
+        if position == 0:
+            return True
+        with open(self.path, "rb") as f:
+            f.seek(position - 1)
+            return f.read(1) == b"\n"
+
+    def _scan(self, start: int):
+        """Index every non-blank, not-yet-seen line from byte ``start`` on."""
+        seen = set()
+        with open(self.path, "rb") as f:
+            f.seek(start)
+            position = start
+            last = b"\n"
+            for raw_line in f:
+                item = raw_line.decode("utf-8").strip()
+                if item:
+                    h = item_hash(item)
+                    if h not in seen and not self.has_hash(h):
+                        seen.add(h)
+                        self.offsets.append(position)
+                        self.hashes.append(h)
+                position += len(raw_line)
+                last = raw_line[-1:]
+        self._add_sorted_hashes(seen)
+        instrumentation.add("bytes_read", position - start)
+        self._indexed_up_to(position)
+        self.ends_with_newline = last == b"\n"
+
+    def _add_sorted_hashes(self, hashes: Collection[int]):
+        """
+        Merge new hashes into sorted_hashes. Each in-place insert moves the
+        whole array, so only a few are inserted one by one; a larger batch
+        is merged with one sort, which finds the existing sorted run and is
+        close to linear.
+        """
+        if len(hashes) <= _INSORT_MAX:
+            for h in hashes:
+                bisect.insort(self.sorted_hashes, h)
+        else:
+            self.sorted_hashes = array("Q", sorted(self.sorted_hashes.tolist() + list(hashes)))
+
+    def _indexed_up_to(self, size: int):
+        """Record that the index now covers the first size bytes of the text file."""
+        st = os.stat(self.path)
+        self.inode, self.size, self.mtime_ns = st.st_ino, size, st.st_mtime_ns
+        self.tail = read_tail_digest(self.path, size)
+
+    def _header(self) -> bytes:
+        return _INDEX_HEADER.pack(_INDEX_MAGIC, self.inode, self.size, self.mtime_ns, self.tail, len(self.offsets))
+
+    def _indexed(self):
+        """What the sidecar looks like if it matches this index: (header, entry count)."""
+        return self._header(), len(self.offsets)
+
+    def _records(self, first: int) -> bytes:
+        records = array("Q", bytes((len(self.offsets) - first) * _INDEX_RECORD.size))
+        records[0::2] = self.offsets[first:]
+        records[1::2] = self.hashes[first:]
+        return records.tobytes()
+
+    def _write_index(self, indexed=None):
+        """
+        Append the records added since ``indexed`` (see _indexed) to the
+        sidecar if it still describes that state, else rewrite it whole.
+        Left alone if another worker already brought it up to date.
+        """
+        header = self._header()
+        with locked(self.index_path):
+            try:
+                with open(self.index_path, "r+b") as f:
+                    current = f.read(_INDEX_HEADER.size)
+                    size = os.fstat(f.fileno()).st_size
+                    if current == header and size == _INDEX_HEADER.size + len(self.offsets) * _INDEX_RECORD.size:
+                        return
+                    if indexed is not None and current == indexed[0] \
+                            and size == _INDEX_HEADER.size + indexed[1] * _INDEX_RECORD.size:
+                        f.seek(0, os.SEEK_END)
+                        f.write(self._records(indexed[1]))
+                        f.seek(0)
+                        f.write(header)
+                        return
+            except FileNotFoundError:
+                pass
+            atomic_write(self.index_path, header + self._records(0))
+
+    # Reading
+
+    def read_items(self, indices: Iterable[int]) -> List[str]:
+        """Fetch the items at the given positions by seeking to their offsets."""
+        indices = list(indices)
+        items = []
+        if not indices:
+            # Nothing to read, and the text file may not exist yet
+            return items
+        nbytes = 0
+        with self.lock, open(self.path, "rb") as f:
+            for i in indices:
+                f.seek(self.offsets[i])
+                raw_line = f.readline()
+                nbytes += len(raw_line)
+                items.append(raw_line.decode("utf-8").strip())
+        instrumentation.add("bytes_read", nbytes)
+        return items
+
+    def read_all(self) -> List[str]:
+        return self.read_items(range(len(self.offsets)))
+
+    def sample_indices(self, k: int, rng, exclude_hashes: Collection[int] = ()) -> List[int]:
+        """
+        Draw up to k distinct positions uniformly at random, skipping items
+        whose hash is in exclude_hashes. Costs O(k + excluded hits) time and
+        memory (see lazy_shuffle). ``rng`` needs ``randrange``.
+        """
+        picked = []
+        if k <= 0:
+            return picked
+        for chosen in lazy_shuffle(len(self.offsets), rng):
+            if not exclude_hashes or self.hashes[chosen] not in exclude_hashes:
+                picked.append(chosen)
+                if len(picked) >= k:
+                    break
+        return picked
+
+    def sample(self, k: int, rng, exclude_hashes: Collection[int] = ()) -> List[str]:
+        with self.lock:
+            return self.read_items(self.sample_indices(k, rng, exclude_hashes))
+
+    # Writing
+
+    def extend(self, items: Iterable[str]) -> List[str]:
+        """Append the items not already in the store; returns the ones added."""
+        added = []
+        new_hashes = []
+        seen = set()
+        for item in items:
+            h = item_hash(item)
+            if h not in seen and not self.has_hash(h):
+                seen.add(h)
+                added.append(item)
+                new_hashes.append(h)
+        if not added:
+            return added
+        self._add_sorted_hashes(new_hashes)
+
+        indexed = self._indexed()
+        position = self.size
+        chunks = []
+        if not self.ends_with_newline:
+            chunks.append(b"\n")
+            position += 1
+        for item, h in zip(added, new_hashes):
+            encoded = item.encode("utf-8") + b"\n"
+            self.offsets.append(position)
+            self.hashes.append(h)
+            chunks.append(encoded)
+            position += len(encoded)
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        data = b"".join(chunks)
+        with open(self.path, "ab") as f:
+            f.write(data)
+        instrumentation.add("bytes_written", len(data))
+        self._indexed_up_to(position)
+        self.ends_with_newline = True
+        self._write_index(indexed)
+        return added
+
+    def needs_compaction(self, limit: int) -> bool:
+        return compaction_due(len(self.offsets), limit)
+
+    def compact(self, limit: int, rng):
+        """
+        Randomly trim the pool to ``limit`` items and rewrite the text file,
+        backing the previous version up to ``.bk`` first.
+        """
+        trimmed = self.sample(limit, rng)
+        atomic_write(self.path, ("\n".join(trimmed) + "\n").encode("utf-8"), backup_path=self.backup_path)
+
+        self._reset()
+        self._scan(0)
+        self._write_index()
+
+    def trim(self, limit: int, rng) -> bool:
+        """Compact if the pool has outgrown ``limit``; returns True if it did."""
+        if self.needs_compaction(limit):
+            self.compact(limit, rng)
+            return True
+        return False
+
+
+def reservoir_sample(path: str, k: int, rng, exclude_hashes: Collection[int] = ()) -> List[str]:
+    """
+    Sample k distinct non-blank lines from a text file in one streaming pass
+    (Algorithm R), holding only the k chosen lines in memory. Used for pools
+    too large to index; assumes the file's lines are already unique, as
+    ListStore keeps them.
+    """
+    reservoir = []
+    chosen = set()
+    count = 0
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            item = line.strip()
+            if not item:
+                continue
+            h = item_hash(item)
+            if h in exclude_hashes or h in chosen:
+                continue
+            count += 1
+            if len(reservoir) < k:
+                reservoir.append((h, item))
+                chosen.add(h)
+                continue
+            j = rng.randrange(count)
+            if j < k:
+                chosen.discard(reservoir[j][0])
+                reservoir[j] = (h, item)
+                chosen.add(h)
+        instrumentation.add("bytes_read", os.fstat(f.fileno()).st_size)
+    return [item for _, item in reservoir]
+
+
+class DrawCursor:
+    """
+    No-repeat draws from a ListStore, kept in a ``.cursor`` sidecar.
+
+    The sidecar holds a seeded random order of the store's positions and
+    how far into it we are, so successive runs hand out every item once
+    before any repeats, reading and writing only the slots they use. Items
+    added to the store are shuffled into the not-yet-drawn part of the
+    order in place (an inside-out Fisher-Yates step each). A new order is
+    drawn when this one is used up, when the seed changes, or when the
+    store has been compacted (its text file replaced), since positions then
+    refer to other items.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.cursor_path = path + CURSOR_SUFFIX
+
+    def draw(self, store: ListStore, k: int, seed: int, exclude_hashes: Collection[int] = ()) -> List[int]:
+        """
+        Return up to k distinct store positions, continuing from the last
+        draw. Positions whose hash is in exclude_hashes are skipped and
+        count as drawn.
+        """
+        n = len(store)
+        if n == 0 or k <= 0:
+            return []
+        try:
+            inode = os.stat(store.path).st_ino
+        except FileNotFoundError:
+            inode = 0
+
+        header = self._read_header()
+        if header is None or header[0] != inode or header[1] != seed or header[4] > n:
+            header = self._regenerate(inode, seed, 0, n)
+        inode, seed, cycle, position, count = header
+
+        picked = []
+        seen = set()
+        # At most the rest of this order plus one full new one, even if everything is excluded
+        budget = (count - position) + n
+        f = open(self.cursor_path, "r+b")
+        try:
+            if count < n:
+                count = self._extend(f, seed, cycle, position, count, n)
+            while len(picked) < k and budget > 0:
+                if position >= count:
+                    # Used up: start the next cycle with a new order
+                    f.close()
+                    cycle += 1
+                    _, _, _, position, count = self._regenerate(inode, seed, cycle, n)
+                    f = open(self.cursor_path, "r+b")
+                want = min(k - len(picked), count - position, budget)
+                f.seek(_CURSOR_HEADER.size + position * _CURSOR_SLOT.size)
+                slots = array("I", f.read(want * _CURSOR_SLOT.size))
+                position += want
+                budget -= want
+                for i in slots:
+                    if i in seen or (exclude_hashes and store.hashes[i] in exclude_hashes):
+                        continue
+                    seen.add(i)
+                    picked.append(i)
+            f.seek(0)
+            f.write(_CURSOR_HEADER.pack(_CURSOR_MAGIC, inode, seed, cycle, position, count))
+        finally:
+            f.close()
+        return picked
+
+    def _read_header(self):
+        try:
+            with open(self.cursor_path, "rb") as f:
+                raw = f.read(_CURSOR_HEADER.size)
+                size = os.fstat(f.fileno()).st_size
+        except FileNotFoundError:
+            return None
+        if len(raw) < _CURSOR_HEADER.size:
+            return None
+        magic, inode, seed, cycle, position, count = _CURSOR_HEADER.unpack(raw)
+        if magic != _CURSOR_MAGIC or size != _CURSOR_HEADER.size + count * _CURSOR_SLOT.size or position > count:
+            return None
+        return inode, seed, cycle, position, count
+
+    def _regenerate(self, inode: int, seed: int, cycle: int, n: int):
+        """Write a fresh order of all n positions; the only O(n) step."""
+        order = array("I", range(n))
+        if order.itemsize != _CURSOR_SLOT.size:
+            raise RuntimeError("array('I') is not 4 bytes on this platform")
+        random.Random(f"{seed}:{cycle}").shuffle(order)
+        header = (inode, seed, cycle, 0, n)
+        atomic_write(self.cursor_path, _CURSOR_HEADER.pack(_CURSOR_MAGIC, *header) + order.tobytes())
+        return header
+
+    @staticmethod
+    def _extend(f, seed: int, cycle: int, position: int, count: int, n: int) -> int:
+        """Shuffle positions count..n-1 into the undrawn slots [position, n); returns n."""
+        rng = random.Random(f"{seed}:{cycle}:{count}")
+        for new in range(count, n):
+            j = rng.randrange(position, new + 1)
+            f.seek(_CURSOR_HEADER.size + j * _CURSOR_SLOT.size)
+            displaced = f.read(_CURSOR_SLOT.size) if j < new else b""
+            f.seek(_CURSOR_HEADER.size + j * _CURSOR_SLOT.size)
+            f.write(_CURSOR_SLOT.pack(new))
+            if displaced:
+                f.seek(_CURSOR_HEADER.size + new * _CURSOR_SLOT.size)
+                f.write(displaced)
+        return n
@@ -0,0 +1,163 @@
+import atexit
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+from . import instrumentation
+from .file_cache import shared_cache
+from .file_lock import atomic_write, locked
+
+FSYNC_POLICIES = ("none", "on-flush", "every-write")
+
+# Defaults for the shared writer, overridable with environment variables.
+DEFAULT_FLUSH_BYTES = int(os.environ.get("EBU_WRITER_FLUSH_BYTES", str(64 * 1024)))
+DEFAULT_FLUSH_SECONDS = float(os.environ.get("EBU_WRITER_FLUSH_SECONDS", "1.0"))
+DEFAULT_FSYNC_POLICY = os.environ.get("EBU_WRITER_FSYNC", "none")
+MAX_OPEN_HANDLES = 64
+
+logger = logging.getLogger(__name__)
+
+
+class BufferedWriter:
+    """
+    Process-wide appender that coalesces writes per path.
+
+    Appends are buffered in memory and written out through handles kept
+    open between calls, either when a path's buffer reaches ``flush_bytes``
+    or every ``flush_seconds`` from a background thread. Pending data is
+    flushed when the interpreter exits.
+
+    ``fsync_policy`` controls durability: "none" leaves it to the OS,
+    "on-flush" fsyncs after each batch is written, and "every-write" writes
+    and fsyncs each append immediately (keeping only the open handle).
+    """
+
+    def __init__(self, flush_bytes: int = DEFAULT_FLUSH_BYTES, flush_seconds: float = DEFAULT_FLUSH_SECONDS,
+                 fsync_policy: str = DEFAULT_FSYNC_POLICY):
+        if fsync_policy not in FSYNC_POLICIES:
+            raise ValueError(f"fsync_policy must be one of {FSYNC_POLICIES}, got {fsync_policy!r}")
+        self.flush_bytes = flush_bytes
+        self.flush_seconds = flush_seconds
+        self.fsync_policy = fsync_policy
+        self.flushes = 0
+        self.bytes_written = 0
+        self._buffers = {}
+        self._handles = OrderedDict()
+        self._lock = threading.RLock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._closed = False
+        atexit.register(self.close)
+
+    @staticmethod
+    def key(path: str) -> str:
+        return os.path.abspath(path)
+
+    def write(self, path: str, data: str, overwrite: bool = False):
+        """Queue data for path; with overwrite, the file is truncated first."""
+        key = self.key(path)
+        encoded = data.encode("utf-8")
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("BufferedWriter is closed")
+            if overwrite:
+                self._buffers.pop(key, None)
+                self._close_handle(key)
+                os.makedirs(os.path.dirname(key), exist_ok=True)
+                with locked(key):
+                    atomic_write(key, b"")
+                shared_cache.invalidate(key)
+            buffer = self._buffers.setdefault(key, bytearray())
+            buffer += encoded
+            if self.fsync_policy == "every-write" or len(buffer) >= self.flush_bytes:
+                self._flush_path(key)
+            self._ensure_thread()
+
+    def pending(self, path: str) -> bool:
+        return bool(self._buffers.get(self.key(path)))
+
+    def flush(self, path: str = None):
+        """Write out pending data for one path, or for every path."""
+        with self._lock:
+            if path is not None:
+                self._flush_path(self.key(path))
+            else:
+                for key in list(self._buffers):
+                    self._flush_path(key)
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self.flush()
+            for key in list(self._handles):
+                self._close_handle(key)
+            self._closed = True
+        self._wakeup.set()
+
+    def _flush_path(self, key: str):
+        buffer = self._buffers.pop(key, None)
+        if not buffer:
+            return
+        try:
+            os.makedirs(os.path.dirname(key), exist_ok=True)
+            with locked(key):
+                handle = self._handle(key)
+                handle.write(buffer)
+                handle.flush()
+                if self.fsync_policy != "none":
+                    os.fsync(handle.fileno())
+        except OSError:
+            # Keep the data queued so a later flush can retry it.
+            self._buffers[key] = buffer + self._buffers.get(key, b"")
+            self._close_handle(key)
+            raise
+        self.flushes += 1
+        self.bytes_written += len(buffer)
+        instrumentation.add("bytes_written", len(buffer))
+        # Not invalidated: the file only grew, which cached entries detect, and
+        # indexes cached for it can then refresh from the new tail
+
+    def _handle(self, key: str):
+        handle = self._handles.get(key)
+        if handle is not None:
+            try:
+                replaced = os.stat(key).st_ino != os.fstat(handle.fileno()).st_ino
+            except FileNotFoundError:
+                replaced = True
+            if not replaced:
+                self._handles.move_to_end(key)
+                return handle
+            # The file was replaced or removed since we opened it; reopen by name.
+            self._close_handle(key)
+
+        handle = open(key, "ab")
+        self._handles[key] = handle
+        while len(self._handles) > MAX_OPEN_HANDLES:
+            self._close_handle(next(iter(self._handles)))
+        return handle
+
+    def _close_handle(self, key: str):
+        handle = self._handles.pop(key, None)
+        if handle is not None:
+            handle.close()
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="ebu-buffered-writer", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._closed:
+            self._wakeup.wait(self.flush_seconds)
+            if self._closed:
+                return
+            try:
+                self.flush()
+            except OSError as e:
+                logger.warning("Buffered writer flush failed: %s", e)
+
+
+# Shared by every EbuAppendToFile node in this process.
+shared_writer = BufferedWriter()
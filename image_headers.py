@@ -0,0 +1,205 @@
+import json
+import os
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+
+from .file_lock import atomic_write, locked
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp")
+
+_INDEX_VERSION = 1
+
+# JPEG start-of-frame markers (baseline, progressive, lossless, ...), which carry the size
+_JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+# Markers with no length field
+_JPEG_STANDALONE_MARKERS = {0x01, 0xD0, 0xD1, 0xD2, 0xD3, 0xD4, 0xD5, 0xD6, 0xD7, 0xD8}
+
+
+def read_image_size(path: str) -> Optional[Tuple[int, int]]:
+    """
+    Return (width, height) of a PNG, JPEG or WebP file by parsing only its
+    header, or None if the file is not a format we can read.
+
+    JPEGs with an EXIF orientation that rotates the image by 90 degrees
+    report their dimensions swapped, matching what ComfyUI's image loader
+    produces after applying the orientation. Truncated headers also give
+    None.
+    """
+    with open(path, "rb") as f:
+        head = f.read(32)
+        if head.startswith(b"\x89PNG\r\n\x1a\n") and head[12:16] == b"IHDR" and len(head) >= 24:
+            return struct.unpack(">II", head[16:24])
+        if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+            return _webp_size(head)
+        if head[:2] == b"\xff\xd8":
+            f.seek(2)
+            return _jpeg_size(f)
+    return None
+
+
+def _webp_size(head: bytes) -> Optional[Tuple[int, int]]:
+    # Every chunk type below keeps its size within the first 30 bytes
+    if len(head) < 30:
+        return None
+    chunk = head[12:16]
+    if chunk == b"VP8 " and head[23:26] == b"\x9d\x01\x2a":
+        width, height = struct.unpack("<HH", head[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b"VP8L" and head[20] == 0x2F:
+        bits = int.from_bytes(head[21:25], "little")
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b"VP8X":
+        return int.from_bytes(head[24:27], "little") + 1, int.from_bytes(head[27:30], "little") + 1
+    return None
+
+
+def _jpeg_size(f) -> Optional[Tuple[int, int]]:
+    orientation = 1
+    while True:
+        byte = f.read(1)
+        if not byte:
+            return None
+        if byte != b"\xff":
+            continue
+        marker = f.read(1)
+        while marker == b"\xff":  # fill bytes
+            marker = f.read(1)
+        if not marker:
+            return None
+        marker = marker[0]
+        if marker in _JPEG_STANDALONE_MARKERS:
+            continue
+        if marker == 0xD9:  # end of image before any frame header
+            return None
+        length_bytes = f.read(2)
+        if len(length_bytes) < 2:
+            return None
+        length = struct.unpack(">H", length_bytes)[0]
+        if length < 2:  # the length counts its own two bytes
+            return None
+        if marker in _JPEG_SOF_MARKERS:
+            frame = f.read(5)
+            if len(frame) < 5:
+                return None
+            height, width = struct.unpack(">HH", frame[1:5])
+            if orientation in (5, 6, 7, 8):
+                width, height = height, width
+            return width, height
+        if marker == 0xE1:
+            orientation = _exif_orientation(f.read(length - 2)) or orientation
+        else:
+            f.seek(length - 2, os.SEEK_CUR)
+
+
+def _exif_orientation(segment: bytes) -> Optional[int]:
+    if not segment.startswith(b"Exif\x00\x00"):
+        return None
+    tiff = segment[6:]
+    if tiff[:2] == b"II":
+        endian = "<"
+    elif tiff[:2] == b"MM":
+        endian = ">"
+    else:
+        return None
+    try:
+        ifd_offset = struct.unpack(endian + "I", tiff[4:8])[0]
+        count = struct.unpack(endian + "H", tiff[ifd_offset:ifd_offset + 2])[0]
+        for i in range(count):
+            entry = ifd_offset + 2 + i * 12
+            tag = struct.unpack(endian + "H", tiff[entry:entry + 2])[0]
+            if tag == 0x0112:
+                return struct.unpack(endian + "H", tiff[entry + 8:entry + 10])[0]
+    except struct.error:
+        return None
+    return None
+
+
+def walk_images(root: str, recursive: bool = True) -> Dict[str, list]:
+    """Map the path (relative to root) of every image file under root to [mtime_ns, size]."""
+    found = {}
+    directories = [root]
+    while directories:
+        with os.scandir(directories.pop()) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    if recursive:
+                        directories.append(entry.path)
+                elif entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                    st = entry.stat()
+                    found[os.path.relpath(entry.path, root)] = [st.st_mtime_ns, st.st_size]
+    return found
+
+
+class ImageSizeIndex:
+    """
+    Persistent index of image dimensions under a directory, keyed by path
+    relative to that directory and validated by (mtime_ns, size).
+
+    ``scan`` stats every image file but only opens the new or changed ones,
+    reading their headers from a thread pool, so rescanning a large folder
+    mostly costs one directory walk.
+    """
+
+    def __init__(self, index_path: str):
+        self.index_path = index_path
+        self.root = None
+        # relative path -> [mtime_ns, size, width, height]; 0x0 if unreadable
+        self.entries: Dict[str, list] = {}
+
+    def sizes(self) -> Dict[str, Tuple[int, int]]:
+        """(width, height) of every readable image, keyed by relative path."""
+        return {rel: (entry[2], entry[3]) for rel, entry in self.entries.items() if entry[2] and entry[3]}
+
+    def load(self, root: str) -> "ImageSizeIndex":
+        self.root = os.path.abspath(root)
+        self.entries = {}
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return self
+        if data.get("version") == _INDEX_VERSION and data.get("root") == self.root:
+            self.entries = data.get("entries", {})
+        return self
+
+    def save(self):
+        data = {"version": _INDEX_VERSION, "root": self.root, "entries": self.entries}
+        atomic_write(self.index_path, json.dumps(data, separators=(",", ":")).encode("utf-8"))
+
+    def scan(self, recursive: bool = True, max_workers: int = None) -> int:
+        """Bring the index up to date with the directory; returns how many files were (re)read."""
+        found = walk_images(self.root, recursive)
+
+        stale = [rel for rel, stat in found.items()
+                 if rel not in self.entries or self.entries[rel][:2] != stat]
+        removed = [rel for rel in self.entries if rel not in found]
+        for rel in removed:
+            del self.entries[rel]
+
+        if stale:
+            if max_workers is None:
+                max_workers = min(32, (os.cpu_count() or 1) * 4)
+            with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                sizes = pool.map(self._read_size, stale)
+                for rel, size in zip(stale, sizes):
+                    # Unreadable files stay in the index so they aren't retried every scan
+                    self.entries[rel] = [*found[rel], *(size or (0, 0))]
+        return len(stale) + len(removed)
+
+    def _read_size(self, rel: str) -> Optional[Tuple[int, int]]:
+        try:
+            return read_image_size(os.path.join(self.root, rel))
+        except (OSError, struct.error, IndexError):
+            # A malformed header makes the file unreadable, not the scan
+            return None
+
+
+def scan_image_sizes(directory: str, index_path: str, recursive: bool = True) -> ImageSizeIndex:
+    """Load, incrementally rescan and (if anything changed) save the index for directory."""
+    os.makedirs(os.path.dirname(index_path) or ".", exist_ok=True)
+    with locked(index_path):
+        index = ImageSizeIndex(index_path).load(directory)
+        if index.scan(recursive) or not os.path.exists(index_path):
+            index.save()
+    return index
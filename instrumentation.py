@@ -0,0 +1,223 @@
+import atexit
+import bisect
+import functools
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar
+
+logger = logging.getLogger(__name__)
+
+# EBU_LOG_LEVEL (e.g. DEBUG, WARNING) sets the level of every logger in this
+# package; unset, they follow ComfyUI's logging configuration.
+LOG_LEVEL = os.environ.get("EBU_LOG_LEVEL", "").upper()
+if LOG_LEVEL:
+    logging.getLogger(__package__).setLevel(LOG_LEVEL)
+
+# EBU_METRICS=1 turns collection on. EBU_METRICS_FILE also turns it on and
+# writes a JSON snapshot there when the process exits.
+METRICS_FILE = os.environ.get("EBU_METRICS_FILE", "")
+ROUTE = "/ebu/metrics"
+
+# Upper bounds (seconds) of the latency histogram buckets; the last is open-ended.
+LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, float("inf"))
+
+COUNTERS = ("bytes_read", "bytes_written", "cache_hits", "cache_misses")
+
+enabled = os.environ.get("EBU_METRICS", "").lower() in ("1", "true", "yes") or bool(METRICS_FILE)
+
+
+class NodeStats:
+    """Call count, errors, latency histogram and I/O counters for one node class."""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.counters = dict.fromkeys(COUNTERS, 0)
+
+    def observe(self, seconds: float, failed: bool):
+        self.calls += 1
+        if failed:
+            self.errors += 1
+        self.seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+
+    def as_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "seconds": self.seconds,
+            "max_seconds": self.max_seconds,
+            "latency_buckets": {str(bound): count for bound, count in zip(LATENCY_BUCKETS, self.buckets)},
+            **self.counters,
+        }
+
+
+_lock = threading.Lock()
+_nodes = {}
+_totals = dict.fromkeys(COUNTERS, 0)
+# Stats of the node whose FUNCTION is running in this thread/task, if any
+_current = ContextVar("ebu_current_node", default=None)
+
+
+def set_enabled(value: bool):
+    global enabled
+    enabled = bool(value)
+
+
+def reset():
+    with _lock:
+        _nodes.clear()
+        for name in _totals:
+            _totals[name] = 0
+
+
+def add(counter: str, amount: int = 1):
+    """
+    Add to one of COUNTERS, for the running node and for the process.
+    Costs one global lookup when metrics are off.
+    """
+    if not enabled:
+        return
+    stats = _current.get()
+    with _lock:
+        _totals[counter] += amount
+        if stats is not None:
+            stats.counters[counter] += amount
+
+
+def _stats_for(name: str) -> NodeStats:
+    with _lock:
+        stats = _nodes.get(name)
+        if stats is None:
+            stats = _nodes[name] = NodeStats()
+        return stats
+
+
+def instrument(name: str, func):
+    """
+    Wrap a node's FUNCTION (plain or async) so calls are timed and counted
+    under name. A node calling another node's FUNCTION is only counted
+    once, under the outer node.
+    """
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            if not enabled or _current.get() is not None:
+                return await func(*args, **kwargs)
+            stats = _stats_for(name)
+            token = _current.set(stats)
+            start = time.perf_counter()
+            failed = True
+            try:
+                result = await func(*args, **kwargs)
+                failed = False
+                return result
+            finally:
+                _finish(stats, token, start, failed)
+    else:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not enabled or _current.get() is not None:
+                return func(*args, **kwargs)
+            stats = _stats_for(name)
+            token = _current.set(stats)
+            start = time.perf_counter()
+            failed = True
+            try:
+                result = func(*args, **kwargs)
+                failed = False
+                return result
+            finally:
+                _finish(stats, token, start, failed)
+
+    wrapper.__ebu_instrumented__ = True
+    return wrapper
+
+
+def _finish(stats: NodeStats, token, start: float, failed: bool):
+    elapsed = time.perf_counter() - start
+    _current.reset(token)
+    with _lock:
+        stats.observe(elapsed, failed)
+
+
+def instrument_nodes(class_mappings: dict):
+    """Wrap the FUNCTION of every node class in class_mappings, once per class."""
+    for name, cls in class_mappings.items():
+        func = getattr(cls, cls.FUNCTION)
+        if getattr(func, "__ebu_instrumented__", False):
+            if cls.FUNCTION in vars(cls):
+                continue
+            # Inherited from an instrumented base; count it under this class instead
+            func = func.__wrapped__
+        setattr(cls, cls.FUNCTION, instrument(name, func))
+
+
+def snapshot() -> dict:
+    """Everything collected so far, plus the file cache, lock and writer counters."""
+    from .file_cache import shared_cache
+    from .file_lock import lock_stats
+    from .file_writer import shared_writer
+
+    with _lock:
+        nodes = {name: stats.as_dict() for name, stats in sorted(_nodes.items())}
+        totals = dict(_totals)
+    return {
+        "enabled": enabled,
+        "time": time.time(),
+        "nodes": nodes,
+        "totals": totals,
+        "file_cache": shared_cache.stats(),
+        "locks": lock_stats.as_dict(),
+        "writer": {"flushes": shared_writer.flushes, "bytes_written": shared_writer.bytes_written},
+    }
+
+
+def dump_json(path: str):
+    """Write the current snapshot to path as JSON."""
+    from .file_lock import atomic_write
+
+    atomic_write(path, json.dumps(snapshot(), indent=2).encode("utf-8"))
+
+
+def register_routes() -> bool:
+    """
+    Serve the snapshot as JSON at ROUTE on ComfyUI's server when metrics
+    are enabled. Returns False outside ComfyUI or with metrics off.
+    """
+    if not enabled:
+        return False
+    try:
+        from aiohttp import web
+        from server import PromptServer
+    except ImportError:
+        return False
+    if getattr(PromptServer, "instance", None) is None:
+        return False
+
+    @PromptServer.instance.routes.get(ROUTE)
+    async def metrics_route(request):
+        return web.json_response(snapshot())
+
+    logger.info("Serving node metrics at %s", ROUTE)
+    return True
+
+
+def _dump_at_exit():
+    try:
+        dump_json(METRICS_FILE)
+    except OSError as e:
+        logger.warning("Could not write metrics to %s: %s", METRICS_FILE, e)
+
+
+if METRICS_FILE:
+    atexit.register(_dump_at_exit)
@@ -0,0 +1,193 @@
+import mmap
+import os
+import struct
+import threading
+from array import array
+from typing import Optional
+
+from . import instrumentation
+from .file_cache import APPENDED, UNCHANGED, file_change, tail_digest
+from .file_lock import atomic_write, locked
+
+LINES_SUFFIX = ".lines"
+
+_LINES_MAGIC = b"EBULINE2"
+# magic, indexed file inode, size, mtime_ns, digest of the indexed tail (see file_change), line count
+_LINES_HEADER = struct.Struct("<8sQQq8sQ")
+
+
+def _map(f) -> Optional[mmap.mmap]:
+    """Read-only map of an open file, or None if it is empty (which mmap rejects)."""
+    if os.fstat(f.fileno()).st_size == 0:
+        return None
+    return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def read_byte_range(path: str, start: int, end: int = -1) -> str:
+    """Decode bytes [start, end) of path; end < 0 reads to the end of the file."""
+    with open(path, "rb") as f:
+        mm = _map(f)
+        if mm is None:
+            return ""
+        with mm:
+            end = len(mm) if end < 0 else min(end, len(mm))
+            start = min(start, end)
+            instrumentation.add("bytes_read", end - start)
+            return mm[start:end].decode("utf-8", errors="replace")
+
+
+class LineIndex:
+    """
+    Byte offset of the start of every line in a text file, persisted in a
+    ``.lines`` sidecar so line-addressed reads never scan the file.
+
+    The sidecar records which inode, size and mtime it covers plus a digest
+    of the bytes just before that size (see ``file_change``). When the same
+    file has only grown since, just the new tail is scanned for newlines and
+    the new offsets are appended to the sidecar in place; anything else
+    rebuilds it.
+    Reads go through ``mmap`` and touch only the bytes they return.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.index_path = path + LINES_SUFFIX
+        # Held while the index is refreshed in place, so readers sharing a
+        # cached index in this process never see it half updated.
+        self.lock = threading.RLock()
+        self.offsets = array("Q")
+        self.inode = 0
+        self.size = 0
+        self.mtime_ns = 0
+        self.tail = b""
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def nbytes(self) -> int:
+        return self.offsets.itemsize * len(self.offsets)
+
+    # Loading
+
+    def refresh(self) -> "LineIndex":
+        """Bring the index up to date with the file, reading the sidecar if we have nothing yet."""
+        with self.lock, open(self.path, "rb") as f:
+            st = os.fstat(f.fileno())
+            if not self.offsets and self.size == 0:
+                self._read_sidecar()
+            change = file_change(self.path, st, self.inode, self.size, self.mtime_ns, self.tail)
+            if change == UNCHANGED:
+                return self
+            mm = _map(f)
+            if mm is None:
+                self._reset(st)
+                return self
+            with mm:
+                indexed = (self.inode, self.size, self.mtime_ns, len(self.offsets), self.tail)
+                if change != APPENDED:
+                    self._reset(st)
+                    indexed = None
+                self._scan(mm)
+                self.inode, self.mtime_ns = st.st_ino, st.st_mtime_ns
+            self._write_sidecar(indexed)
+        return self
+
+    def _reset(self, st):
+        self.offsets = array("Q")
+        self.inode = st.st_ino
+        self.size = 0
+        self.mtime_ns = st.st_mtime_ns
+        self.tail = tail_digest(b"", 0)
+
+    def _scan(self, mm: mmap.mmap):
+        """Record line starts from the indexed size to the end of the mapping."""
+        size = len(mm)
+        offsets = self.offsets
+        if not offsets:
+            offsets.append(0)
+        instrumentation.add("bytes_read", size - self.size)
+        # Start one byte back so a newline ending the old tail opens a line in the new one
+        position = mm.find(b"\n", max(self.size - 1, 0))
+        while position != -1 and position + 1 < size:
+            if position + 1 > offsets[-1]:
+                offsets.append(position + 1)
+            position = mm.find(b"\n", position + 1)
+        self.size = size
+        self.tail = tail_digest(mm, size)
+
+    def _read_sidecar(self):
+        try:
+            with open(self.index_path, "rb") as f:
+                raw = f.read()
+        except FileNotFoundError:
+            return
+        if len(raw) < _LINES_HEADER.size:
+            return
+        magic, inode, size, mtime_ns, tail, count = _LINES_HEADER.unpack_from(raw)
+        if magic != _LINES_MAGIC or len(raw) != _LINES_HEADER.size + count * 8:
+            return
+        offsets = array("Q", raw[_LINES_HEADER.size:])
+        if offsets.itemsize != 8:
+            return
+        self.offsets, self.inode, self.size, self.mtime_ns, self.tail = offsets, inode, size, mtime_ns, tail
+
+    def _header(self) -> bytes:
+        return _LINES_HEADER.pack(_LINES_MAGIC, self.inode, self.size, self.mtime_ns, self.tail,
+                                 len(self.offsets))
+
+    def _write_sidecar(self, indexed):
+        """
+        Append the offsets added since ``indexed`` (inode, size, mtime_ns, count, tail)
+        to the sidecar if it still describes that state, else rewrite it.
+        """
+        with locked(self.index_path):
+            if indexed is not None:
+                inode, size, mtime_ns, count, tail = indexed
+                expected = _LINES_HEADER.pack(_LINES_MAGIC, inode, size, mtime_ns, tail, count)
+                try:
+                    with open(self.index_path, "r+b") as f:
+                        if (f.read(_LINES_HEADER.size) == expected
+                                and os.fstat(f.fileno()).st_size == _LINES_HEADER.size + count * 8):
+                            f.seek(0, os.SEEK_END)
+                            f.write(self.offsets[count:].tobytes())
+                            f.seek(0)
+                            f.write(self._header())
+                            return
+                except FileNotFoundError:
+                    pass
+            atomic_write(self.index_path, self._header() + self.offsets.tobytes())
+
+    # Reading
+
+    def read_lines(self, start: int, end: int = -1) -> str:
+        """Lines [start, end) with their line endings; end < 0 reads to the last line."""
+        with self.lock:
+            return self._read_lines(start, end)
+
+    def _read_lines(self, start: int, end: int) -> str:
+        count = len(self.offsets)
+        end = count if end < 0 else min(end, count)
+        start = min(start, end)
+        if start == end:
+            return ""
+        first = self.offsets[start]
+        last = self.offsets[end] if end < count else self.size
+        with open(self.path, "rb") as f:
+            mm = _map(f)
+            if mm is None:
+                return ""
+            with mm:
+                instrumentation.add("bytes_read", last - first)
+                return mm[first:last].decode("utf-8", errors="replace")
+
+    def last_lines(self, n: int) -> str:
+        return self.read_lines(max(len(self.offsets) - n, 0))
+
+    def line(self, i: int) -> str:
+        """Line i without its line ending."""
+        return self.read_lines(i, i + 1).rstrip("\r\n")
+
+
+def load_line_index(path: str) -> LineIndex:
+    """Load the sidecar for path and extend or rebuild it to match the file."""
+    return LineIndex(path).refresh()
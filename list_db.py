@@ -0,0 +1,401 @@
+import atexit
+import os
+import random
+import sqlite3
+import threading
+from array import array
+from contextlib import contextmanager
+from typing import Collection, Dict, Iterable, List
+
+from . import instrumentation
+from .file_lock import atomic_write
+from .file_store import compaction_due, item_hash, lazy_shuffle
+
+# File holding every named list of a store directory in "database" mode.
+DATABASE_NAME = "lists.sqlite"
+BACKUP_SUFFIX = ".bk"
+
+# SQLite journal mode (EBU_LIST_DB_JOURNAL): "delete" or "truncate" use the
+# rollback journal, which works on network filesystems. "wal" lets readers
+# run alongside a writer, but needs shared memory between the processes, so
+# it is only safe when every worker is on the same machine and the store
+# directory is on a local disk, never on NFS or SMB.
+JOURNAL_MODES = ("delete", "truncate", "wal")
+JOURNAL_MODE = os.environ.get("EBU_LIST_DB_JOURNAL", "delete").lower()
+
+# How long a write waits for another process's transaction before failing.
+BUSY_TIMEOUT_SECONDS = 30.0
+# Rows fetched per "IN (...)" query, well under SQLite's parameter limit.
+_QUERY_BATCH = 500
+_IMPORT_BATCH = 10_000
+# Pages copied per step of an online backup.
+_BACKUP_PAGES = 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS lists (
+    id         INTEGER PRIMARY KEY,
+    name       TEXT NOT NULL UNIQUE,
+    count      INTEGER NOT NULL DEFAULT 0,
+    version    INTEGER NOT NULL DEFAULT 0,
+    generation INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS items (
+    list_id INTEGER NOT NULL,
+    pos     INTEGER NOT NULL,
+    hash    INTEGER NOT NULL,
+    item    TEXT NOT NULL,
+    PRIMARY KEY (list_id, pos)
+) WITHOUT ROWID;
+CREATE UNIQUE INDEX IF NOT EXISTS items_by_hash ON items (list_id, hash);
+CREATE TABLE IF NOT EXISTS cursors (
+    list_id    INTEGER PRIMARY KEY,
+    generation INTEGER NOT NULL,
+    seed       INTEGER NOT NULL,
+    cycle      INTEGER NOT NULL,
+    position   INTEGER NOT NULL,
+    draw_order BLOB NOT NULL
+);
+"""
+
+_SLOT_BYTES = 4  # one uint32 list position per slot of a cursor's draw order
+
+
+def _signed(value: int) -> int:
+    """Map an unsigned 64-bit value onto SQLite's signed INTEGER range."""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def _unsigned(value: int) -> int:
+    return value + (1 << 64) if value < 0 else value
+
+
+def _new_order(seed: int, cycle: int, n: int) -> array:
+    order = array("I", range(n))
+    if order.itemsize != _SLOT_BYTES:
+        raise RuntimeError("array('I') is not 4 bytes on this platform")
+    random.Random(f"{seed}:{cycle}").shuffle(order)
+    return order
+
+
+class ListTransaction:
+    """
+    The operations on named lists, all running inside one transaction of a
+    ListDatabase. Each list keeps the semantics of a ListStore text file:
+    unique stripped items in insertion order, positions 0..count-1.
+    """
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def _list(self, name: str):
+        """(id, count, generation) of a list, or None if it doesn't exist."""
+        return self.conn.execute("SELECT id, count, generation FROM lists WHERE name = ?", (name,)).fetchone()
+
+    def _fetch(self, list_id: int, positions: List[int]) -> Dict[int, tuple]:
+        """{position: (hash, item)} for the given positions of a list."""
+        rows = {}
+        nbytes = 0
+        for start in range(0, len(positions), _QUERY_BATCH):
+            chunk = positions[start:start + _QUERY_BATCH]
+            query = f"SELECT pos, hash, item FROM items WHERE list_id = ? AND pos IN ({','.join('?' * len(chunk))})"
+            for pos, h, item in self.conn.execute(query, (list_id, *chunk)):
+                rows[pos] = (h, item)
+                nbytes += len(item.encode("utf-8"))
+        instrumentation.add("bytes_read", nbytes)
+        return rows
+
+    def names(self) -> List[str]:
+        return [name for (name,) in self.conn.execute("SELECT name FROM lists ORDER BY name")]
+
+    def exists(self, name: str) -> bool:
+        return self._list(name) is not None
+
+    def count(self, name: str) -> int:
+        row = self._list(name)
+        return row[1] if row else 0
+
+    def version(self, name: str) -> int:
+        """Bumped by every change to the list; 0 if it doesn't exist."""
+        row = self.conn.execute("SELECT version FROM lists WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else 0
+
+    def read_all(self, name: str) -> List[str]:
+        row = self._list(name)
+        if row is None:
+            return []
+        items = [item for (item,) in self.conn.execute(
+            "SELECT item FROM items WHERE list_id = ? ORDER BY pos", (row[0],))]
+        instrumentation.add("bytes_read", sum(len(item.encode("utf-8")) for item in items))
+        return items
+
+    def extend(self, name: str, items: Iterable[str]) -> List[str]:
+        """Append the items the list doesn't have yet, creating it if needed; returns the ones added."""
+        pending = {}
+        for item in items:
+            pending.setdefault(_signed(item_hash(item)), item)
+        row = self._list(name)
+        if row is not None and pending:
+            hashes = list(pending)
+            for start in range(0, len(hashes), _QUERY_BATCH):
+                chunk = hashes[start:start + _QUERY_BATCH]
+                query = f"SELECT hash FROM items WHERE list_id = ? AND hash IN ({','.join('?' * len(chunk))})"
+                for (h,) in self.conn.execute(query, (row[0], *chunk)):
+                    del pending[h]
+        if not pending:
+            return []
+
+        if row is None:
+            row = (self.conn.execute("INSERT INTO lists (name) VALUES (?)", (name,)).lastrowid, 0, 0)
+        list_id, count, _ = row
+        self.conn.executemany(
+            "INSERT INTO items (list_id, pos, hash, item) VALUES (?, ?, ?, ?)",
+            ((list_id, count + i, h, item) for i, (h, item) in enumerate(pending.items())))
+        self.conn.execute("UPDATE lists SET count = count + ?, version = version + 1 WHERE id = ?",
+                          (len(pending), list_id))
+        added = list(pending.values())
+        instrumentation.add("bytes_written", sum(len(item.encode("utf-8")) for item in added))
+        return added
+
+    def sample(self, name: str, k: int, rng, exclude_hashes: Collection[int] = ()) -> List[str]:
+        """
+        Up to k distinct random items, skipping those whose item_hash is in
+        exclude_hashes. Only the rows drawn are read.
+        """
+        row = self._list(name)
+        picked = []
+        if row is None or k <= 0:
+            return picked
+        list_id, count, _ = row
+        excluded = {_signed(h) for h in exclude_hashes}
+        positions = lazy_shuffle(count, rng)
+        while len(picked) < k:
+            batch = [pos for _, pos in zip(range(k - len(picked)), positions)]
+            if not batch:
+                break
+            rows = self._fetch(list_id, batch)
+            picked.extend(rows[pos][1] for pos in batch if rows[pos][0] not in excluded)
+        return picked
+
+    def trim(self, name: str, limit: int, rng) -> bool:
+        """
+        Randomly cut the list back to limit items once it has outgrown it
+        (see COMPACTION_SLACK); returns True if it did. This rewrites only
+        this list's rows, inside the transaction, so no backup copy is needed.
+        """
+        row = self._list(name)
+        if row is None or not compaction_due(row[1], limit):
+            return False
+        list_id, count, _ = row
+        keep = [pos for _, pos in zip(range(limit), lazy_shuffle(count, rng))]
+        rows = self._fetch(list_id, keep)
+        self.conn.execute("DELETE FROM items WHERE list_id = ?", (list_id,))
+        self.conn.executemany(
+            "INSERT INTO items (list_id, pos, hash, item) VALUES (?, ?, ?, ?)",
+            ((list_id, i, *rows[pos]) for i, pos in enumerate(keep)))
+        self.conn.execute(
+            "UPDATE lists SET count = ?, version = version + 1, generation = generation + 1 WHERE id = ?",
+            (len(keep), list_id))
+        return True
+
+    def draw(self, name: str, k: int, seed: int, exclude_hashes: Collection[int] = ()) -> List[str]:
+        """
+        No-repeat draws, the database counterpart of DrawCursor: the list's
+        cursor row holds a seeded order of its positions and how far into it
+        we are. New items are shuffled into the undrawn part; a new order is
+        made when this one is used up, the seed changes or the list has been
+        trimmed. Needs a write transaction.
+        """
+        row = self._list(name)
+        picked = []
+        if row is None or k <= 0:
+            return picked
+        list_id, n, generation = row
+        excluded = {_signed(h) for h in exclude_hashes}
+
+        cursor = self.conn.execute(
+            "SELECT generation, seed, cycle, position, length(draw_order) / ? FROM cursors WHERE list_id = ?",
+            (_SLOT_BYTES, list_id)).fetchone()
+        order = None
+        if (cursor is None or cursor[0] != generation or _unsigned(cursor[1]) != seed
+                or cursor[4] > n or cursor[3] > cursor[4]):
+            cycle, position = 0, 0
+            order = _new_order(seed, cycle, n)
+        else:
+            _, seed, cycle, position, length = cursor
+            seed = _unsigned(seed)
+            if length < n:
+                order = array("I", self.conn.execute(
+                    "SELECT draw_order FROM cursors WHERE list_id = ?", (list_id,)).fetchone()[0])
+                rng = random.Random(f"{seed}:{cycle}:{length}")
+                for new in range(length, n):
+                    j = rng.randrange(position, new + 1)
+                    order.append(new)
+                    order[j], order[new] = order[new], order[j]
+
+        seen = set()
+        # At most the rest of this order plus one full new one, even if everything is excluded
+        budget = (n - position) + n
+        while len(picked) < k and budget > 0:
+            if position >= n:
+                # Used up: start the next cycle with a new order
+                cycle += 1
+                position = 0
+                order = _new_order(seed, cycle, n)
+            want = min(k - len(picked), n - position, budget)
+            if order is not None:
+                slots = list(order[position:position + want])
+            else:
+                blob = self.conn.execute(
+                    "SELECT substr(draw_order, ?, ?) FROM cursors WHERE list_id = ?",
+                    (position * _SLOT_BYTES + 1, want * _SLOT_BYTES, list_id)).fetchone()[0]
+                slots = list(array("I", blob))
+            position += want
+            budget -= want
+            rows = self._fetch(list_id, [i for i in slots if i not in seen])
+            for i in slots:
+                if i in seen or rows[i][0] in excluded:
+                    continue
+                seen.add(i)
+                picked.append(rows[i][1])
+
+        if order is not None:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO cursors (list_id, generation, seed, cycle, position, draw_order) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (list_id, generation, _signed(seed), cycle, position, order.tobytes()))
+        else:
+            self.conn.execute("UPDATE cursors SET cycle = ?, position = ? WHERE list_id = ?",
+                              (cycle, position, list_id))
+        return picked
+
+
+class ListDatabase:
+    """
+    Many named lists in one SQLite file, as an alternative to one text file
+    (plus ``.idx`` and ``.bk``) per list.
+
+    Every change, including a compaction, commits or rolls back as a whole
+    through SQLite's journal (see JOURNAL_MODE), which is what the ``.bk``
+    copies guard against for text files. Each list has a unique index on
+    the item hashes for dedup, and any number of lists can be read or
+    updated in one transaction. One connection per file is kept open for
+    the life of the process and shared between threads under a lock;
+    other processes coordinate through SQLite's own locking.
+    """
+
+    def __init__(self, path: str, journal_mode: str = JOURNAL_MODE):
+        if journal_mode not in JOURNAL_MODES:
+            raise ValueError(f"journal_mode must be one of {JOURNAL_MODES}, got {journal_mode!r}")
+        self.path = path
+        self.journal_mode = journal_mode
+        self._lock = threading.RLock()
+        self._conn = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_SECONDS,
+                                   isolation_level=None, check_same_thread=False)
+            conn.execute(f"PRAGMA journal_mode = {self.journal_mode}")
+            # NORMAL is only crash-safe with a write-ahead log
+            conn.execute("PRAGMA synchronous = NORMAL" if self.journal_mode == "wal" else "PRAGMA synchronous = FULL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    @contextmanager
+    def transaction(self, write: bool = False):
+        """
+        Yield a ListTransaction. Read transactions see one snapshot of every
+        list; write transactions take the database's write lock up front.
+        """
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE" if write else "BEGIN")
+            try:
+                yield ListTransaction(conn)
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def exists(self, name: str) -> bool:
+        with self.transaction() as lists:
+            return lists.exists(name)
+
+    def version(self, name: str) -> int:
+        with self.transaction() as lists:
+            return lists.version(name)
+
+    def import_text(self, name: str, path: str, if_missing: bool = False) -> int:
+        """
+        Add the lines of a list text file (as EbuFileListCache writes them)
+        to the named list, streaming the file in batches. With if_missing,
+        nothing is imported when the list already exists. Returns the
+        number of items added.
+        """
+        added = 0
+        with self.transaction(write=True) as lists, open(path, "r", encoding="utf-8") as f:
+            if if_missing and lists.exists(name):
+                return 0
+            batch = []
+            for line in f:
+                item = line.strip()
+                if item:
+                    batch.append(item)
+                if len(batch) >= _IMPORT_BATCH:
+                    added += len(lists.extend(name, batch))
+                    batch = []
+            added += len(lists.extend(name, batch))
+        return added
+
+    def export_text(self, name: str, path: str) -> int:
+        """
+        Write the named list as a plain one-item-per-line text file that
+        EbuFileListCache can read, replacing path atomically (its previous
+        version is kept as ``.bk``). Returns the number of items written.
+        """
+        with self.transaction() as lists:
+            items = lists.read_all(name)
+        atomic_write(path, "".join(item + "\n" for item in items).encode("utf-8"), backup_path=path + BACKUP_SUFFIX)
+        return len(items)
+
+    def backup(self, path: str):
+        """
+        Copy the whole database to path with SQLite's online backup, a few
+        pages at a time, so it is a consistent snapshot without a file-level
+        copy of a database that may be mid-write.
+        """
+        with self._lock:
+            target = sqlite3.connect(path)
+            try:
+                self._connect().backup(target, pages=_BACKUP_PAGES)
+            finally:
+                target.close()
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_databases: Dict[str, ListDatabase] = {}
+_databases_lock = threading.Lock()
+
+
+def open_database(directory_name: str) -> ListDatabase:
+    """The shared ListDatabase of a store directory, opened on first use."""
+    path = os.path.abspath(os.path.join(directory_name, DATABASE_NAME))
+    with _databases_lock:
+        db = _databases.get(path)
+        if db is None:
+            db = _databases[path] = ListDatabase(path)
+        return db
+
+
+@atexit.register
+def _close_databases():
+    with _databases_lock:
+        for db in _databases.values():
+            db.close()
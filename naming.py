@@ -0,0 +1,90 @@
+import os
+import re
+import socket
+import threading
+import time
+from datetime import datetime
+
+# Resolution of the timestamp in generated names. "seconds" is the original format.
+PRECISIONS = ["seconds", "milliseconds", "microseconds", "ulid"]
+
+_CROCKFORD_BASE32 = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+_COUNTER_DIGITS = 6
+
+
+def worker_id() -> str:
+    """
+    Identifies this process among workers sharing an output folder:
+    EBU_WORKER_ID if set, else "<host>-<pid>", made safe for file names.
+    """
+    raw = os.environ.get("EBU_WORKER_ID") or f"{socket.gethostname().split('.')[0]}-{os.getpid()}"
+    return re.sub(r"[^A-Za-z0-9_-]+", "_", raw)
+
+
+def timestamp(precision: str, now: datetime) -> str:
+    stamp = now.strftime("%Y_%m_%d_%H_%M_%S")
+    if precision == "milliseconds":
+        return f"{stamp}_{now.microsecond // 1000:03d}"
+    if precision == "microseconds":
+        return f"{stamp}_{now.microsecond:06d}"
+    return stamp
+
+
+def encode_ulid(milliseconds: int, randomness: int) -> str:
+    """26-character Crockford base32 ULID from a 48-bit time and 80 random bits."""
+    value = (milliseconds << 80) | randomness
+    chars = []
+    for _ in range(26):
+        chars.append(_CROCKFORD_BASE32[value & 31])
+        value >>= 5
+    return "".join(reversed(chars))
+
+
+class NameGenerator:
+    """
+    Per-process source of name suffixes that never repeat: a monotonic
+    counter and monotonic ULIDs (within one millisecond the random part is
+    incremented rather than redrawn, so they still sort in creation order).
+    Neither needs to look at what is already on disk.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counter = 0
+        self._last_ms = -1
+        self._last_random = 0
+
+    def next_count(self) -> int:
+        with self._lock:
+            self._counter += 1
+            return self._counter
+
+    def next_ulid(self) -> str:
+        with self._lock:
+            ms = time.time_ns() // 1_000_000
+            if ms <= self._last_ms:
+                # Same millisecond (or the clock stepped back): stay monotonic
+                ms = self._last_ms
+                self._last_random = (self._last_random + 1) & ((1 << 80) - 1)
+                if self._last_random == 0:
+                    ms += 1
+            else:
+                self._last_random = int.from_bytes(os.urandom(10), "big")
+            self._last_ms = ms
+            return encode_ulid(ms, self._last_random)
+
+    def name(self, base: str, join_str: str, precision: str = "seconds",
+             with_worker_id: bool = False, with_counter: bool = False) -> str:
+        if precision == "ulid":
+            parts = [base, self.next_ulid()]
+        else:
+            parts = [base, timestamp(precision, datetime.now())]
+        if with_worker_id:
+            parts.append(worker_id())
+        if with_counter:
+            parts.append(f"{self.next_count():0{_COUNTER_DIGITS}d}")
+        return join_str.join(parts)
+
+
+# Shared by every EbuUniqueFileName node in this process.
+shared_names = NameGenerator()
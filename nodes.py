@@ -1,47 +1,113 @@
+import hashlib
+import logging
 import math
-from datetime import datetime
 import os
-import shutil
 import random
 from typing import Optional, List
 
+from . import instrumentation
+from .async_io import run_io
+from .codec import decode_newlines, encode_file_to_store, encode_newlines
+from .file_cache import file_signature, shared_cache
+from .file_lock import atomic_write, locked
+from .file_store import STREAM_SAMPLE_BYTES, DrawCursor, ListStore, item_hash, reservoir_sample
+from .file_writer import shared_writer
+from .image_headers import scan_image_sizes, walk_images
+from .line_index import LineIndex, load_line_index, read_byte_range
+from .list_db import DATABASE_NAME, open_database
+from .naming import PRECISIONS, shared_names
+from .planner import PRESET_SIZES, RESOLUTION_PRESETS, parse_plan_lines, plan_resolution, plan_resolutions, plan_tiles
+from .ratios import aspect_ratio_registry
+from .resize import COMPUTE_DTYPES, RESIZE_METHODS, ChunkedResizer
+
+logger = logging.getLogger(__name__)
+
+def compute_upscale(original_width, original_height, min_width, min_height):
+    """
+    Return (upscale_by, upscaled_width, upscaled_height) for the smallest
+    factor >= 1.0 that brings an image up to both minimum dimensions.
+    """
+    # Calculate upscale factors for width and height
+    upscale_by_width = 1.0
+    if min_width > 0:
+        upscale_by_width = min_width / original_width
+
+    upscale_by_height = 1.0
+    if min_height > 0:
+        upscale_by_height = min_height / original_height
+
+    # The final upscale factor is the maximum of the two to satisfy both conditions
+    upscale_by = max(upscale_by_width, upscale_by_height, 1.0)
+
+    # Calculate the upscaled dimensions, rounded up to the nearest integer
+    upscaled_width = math.ceil(original_width * upscale_by)
+    upscaled_height = math.ceil(original_height * upscale_by)
+
+    return (upscale_by, upscaled_width, upscaled_height,)
+
+
+def image_dimensions(images):
+    """
+    Return (width, height) for every image in a list of IMAGE batches.
+
+    Every image in one [B, H, W, C] batch shares its size, so each batch is
+    read once and repeated B times rather than indexed image by image.
+    """
+    dimensions = []
+    for batch in images:
+        batch_size, height, width = batch.shape[:3]
+        dimensions.extend([(int(width), int(height))] * int(batch_size))
+    return dimensions
+
+
+def store_file_fingerprint(directory_name, file_name):
+    """
+    IS_CHANGED value for a node whose output depends on a store file: the
+    file's (mtime_ns, size, inode), so ComfyUI reuses the cached output
+    until the file changes. Buffered appends are flushed first so they
+    count as a change. Falls back to "always changed" when the path is fed
+    by a link, since IS_CHANGED doesn't receive linked values.
+    """
+    if directory_name is None or file_name is None:
+        return float("nan")
+    full_path = os.path.join(directory_name, file_name)
+    shared_writer.flush(full_path)
+    try:
+        return "{}-{}-{}".format(*file_signature(full_path))
+    except FileNotFoundError:
+        return ""
+
+
+def parse_list_items(text):
+    """Non-blank lines of a multiline input, stripped."""
+    return [line.strip() for line in text.splitlines() if line.strip()]
+
+
+def check_list_name(name):
+    """List names double as file names for import/export, so they must be plain file names."""
+    if not name or name in (".", "..") or os.path.basename(name) != name or (os.altsep and os.altsep in name):
+        raise ValueError(f"Invalid list name: {name!r}")
+    return name
+
+
 class EbuScalingResolution:
-    aspect_ratios = {
-        "16:9": [
-            "640x360", "960x540", "1024x576", "1088x612", "1152x648", "1216x684", "1280x720", "1344x756", "1408x792", "1472x828", "1536x864", "1600x900", "1792x1024", "1856x1044", "1920x1080", "2048x1152", "2240x1260", "2304x1296", "2560x1440"
-        ],
-        "16:10": [
-            "640x400", "704x440", "768x480", "832x520", "896x560", "960x600", "1024x640", "1088x680", "1152x720", "1216x760", "1280x800", "1344x840", "1408x880", "1472x920", "1536x960", "1600x1000", "1792x1120", "1856x1160", "1920x1200", "2048x1280", "2240x1400", "2560x1600"
-        ],
-        "3:2": [
-            "768x512", "832x554", "896x597", "960x640", "1024x682", "1088x725", "1152x768", "1216x810", "1280x853", "1344x896", "1408x938", "1472x981", "1536x1024", "1600x1066"
-        ],
-        "4:3": [
-            "640x480", "704x528", "768x576", "832x624", "896x672", "960x720", "1024x768", "1088x816", "1152x864", "1216x912", "1280x960", "1344x1008", "1408x1056", "1472x1104", "1536x1152", "1600x1200"
-        ],
-        "5:4": [
-            "640x512", "704x564", "768x615", "832x667", "896x718", "960x770", "1024x821", "1088x872", "1152x924", "1216x975", "1280x1024", "1344x1076", "1408x1128", "1472x1179", "1536x1230", "1600x1280"
-        ],
-        "6:5": [
-            "768x640", "832x693", "896x746", "960x800", "1024x853", "1088x906", "1152x960", "1216x1013", "1280x1066", "1344x1120", "1408x1173", "1472x1226", "1536x1280", "1600x1333"
-        ],
-        "1:1": [
-            "512x512", "576x576", "640x640", "704x704", "768x768", "832x832", "896x896", "960x960", "1024x1024", "1088x1088", "1152x1152", "1216x1216", "1280x1280", "1344x1344", "1408x1408", "1472x1472", "1536x1536", "1600x1600"
-        ]
+    aspect_ratios = RESOLUTION_PRESETS
+
+    # Built once; ComfyUI asks for node definitions on every page load
+    _input_types = {
+        "required": {
+            "active_aspect_ratio": (list(RESOLUTION_PRESETS.keys()) + ["Other"],),
+            **{key: (value,) for key, value in RESOLUTION_PRESETS.items()},
+            "other_width": ("INT", {"default": 1024, "min": 64, "max": 8192, "step": 8, "display": "number"}),
+            "other_height": ("INT", {"default": 1024, "min": 64, "max": 8192, "step": 8, "display": "number"}),
+            "mode": (["Landscape", "Profile"], {"default": "Landscape"}),
+            "upscale_by": ("FLOAT", {"default": 1.5, "min": 1.0, "max": 10.0, "step": 0.05, "display": "number"})
+        }
     }
 
     @classmethod
     def INPUT_TYPES(cls):
-        return {
-            "required": {
-                "active_aspect_ratio": (list(cls.aspect_ratios.keys()) + ["Other"],),
-                **{key: (value,) for key, value in cls.aspect_ratios.items()},
-                "other_width": ("INT", {"default": 1024, "min": 64, "max": 8192, "step": 8, "display": "number"}),
-                "other_height": ("INT", {"default": 1024, "min": 64, "max": 8192, "step": 8, "display": "number"}),
-                "mode": (["Landscape", "Profile"], {"default": "Landscape"}),
-                "upscale_by": ("FLOAT", {"default": 1.5, "min": 1.0, "max": 10.0, "step": 0.05, "display": "number"})
-            }
-        }
+        return cls._input_types
 
     RETURN_TYPES = ("INT", "INT", "INT", "INT", "FLOAT", "STRING",)
     RETURN_NAMES = ("width", "height", "upscaled_width", "upscaled_height", "upscale_by", "upscaled_resolution_string",)
@@ -53,24 +119,44 @@ class EbuScalingResolution:
             width = kwargs["other_width"]
             height = kwargs["other_height"]
         else:
-            resolution = kwargs[active_aspect_ratio]
-            width, height = [int(x) for x in resolution.split('x')]
+            width, height = PRESET_SIZES[active_aspect_ratio][kwargs[active_aspect_ratio]]
+
+        plan = plan_resolution(width, height, kwargs["mode"], kwargs["upscale_by"])
+        width, height, _, _, upscale_by, upscaled_resolution_string = plan
 
-        def round_up_to_multiple_of_eight(value):
-            return math.ceil(value / 8) * 8
+        logger.debug("Original: %dx%d, Scaled: %s, Upscale factor: %s", width, height, upscaled_resolution_string, upscale_by)
 
-        upscale_by = kwargs["upscale_by"]
-        scaled_width = round_up_to_multiple_of_eight(width * upscale_by)
-        scaled_height = round_up_to_multiple_of_eight(height * upscale_by)
+        return plan
 
-        if kwargs["mode"] == "Profile":
-            width, height = height, width
-            scaled_width, scaled_height = scaled_height, scaled_width
-        upscaled_resolution_string = f"{scaled_width}x{scaled_height}"
 
-        print(f"Original: {width}x{height}, Scaled: {upscaled_resolution_string}, Upscale factor: {upscale_by}")
+class EbuScalingResolutionSweep:
+    """
+    Plans many resolutions in one execution for resolution sweeps, e.g.
+    benchmarking a model across sizes. Each line of ``plans`` is
+    "ratio resolution [mode] [upscale_by]" using the same presets as
+    EBU Scaling Resolution; "*" sweeps every ratio or every preset, and
+    ratio "Other" takes a literal "WxH". Outputs are lists, one entry per plan.
+    """
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "plans": ("STRING", {"multiline": True, "default": "16:9 * Landscape 1.5"}),
+            }
+        }
+
+    RETURN_TYPES = ("INT", "INT", "INT", "INT", "FLOAT", "STRING",)
+    RETURN_NAMES = ("width", "height", "upscaled_width", "upscaled_height", "upscale_by", "upscaled_resolution_string",)
+    OUTPUT_IS_LIST = (True, True, True, True, True, True,)
+    FUNCTION = "compute_resolutions"
+    CATEGORY = "Resolution"
 
-        return width, height, scaled_width, scaled_height, upscale_by, upscaled_resolution_string
+    def compute_resolutions(self, plans):
+        try:
+            results = plan_resolutions(parse_plan_lines(plans))
+        except KeyError as e:
+            raise ValueError(f"Unknown aspect ratio or preset: {e}")
+        return tuple(list(column) for column in zip(*results)) if results else ([],) * 6
 
 
 class EbuScalingTile:
@@ -107,23 +193,47 @@ class EbuScalingTile:
         return new_width, new_height
 
 
+class EbuScalingTilePlan:
+    """
+    Planner alternative to EBU Scaling Tile: picks the aligned tile size that
+    covers the image in the fewest tiles under a size or memory budget,
+    wasting the fewest pixels, so no tile padding is needed.
+    """
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "upscaled_image_width": ("INT", {"default": 2048, "min": 1, "max": 32768, "step": 1, "display": "number"}),
+                "upscaled_image_height": ("INT", {"default": 2048, "min": 1, "max": 32768, "step": 1, "display": "number"}),
+                "max_tile_megapixels": ("FLOAT", {"default": 1.0, "min": 0.01, "max": 64.0, "step": 0.05, "display": "number"}),
+                "alignment": ("INT", {"default": 64, "min": 1, "max": 512, "step": 1, "display": "number"}),
+                "overlap": ("INT", {"default": 0, "min": 0, "max": 1024, "step": 1, "display": "number"}),
+                "max_tile_aspect": ("FLOAT", {"default": 2.0, "min": 1.0, "max": 16.0, "step": 0.1, "display": "number"}),
+            },
+            "optional": {
+                "memory_budget_mb": ("FLOAT", {"default": 0.0, "min": 0.0, "max": 1048576.0, "step": 64.0, "display": "number"}),
+                "bytes_per_pixel": ("FLOAT", {"default": 2048.0, "min": 1.0, "max": 1048576.0, "step": 1.0, "display": "number"}),
+            }
+        }
+
+    RETURN_TYPES = ("INT", "INT", "INT", "INT",)
+    RETURN_NAMES = ("tile_width", "tile_height", "tile_count", "overhead_pixels",)
+    FUNCTION = "plan"
+    CATEGORY = "Resolution"
+
+    def plan(self, upscaled_image_width, upscaled_image_height, max_tile_megapixels, alignment, overlap,
+             max_tile_aspect, memory_budget_mb=0.0, bytes_per_pixel=2048.0):
+        max_tile_pixels = int(max_tile_megapixels * 1_000_000)
+        if memory_budget_mb > 0:
+            # Peak memory per tile pixel depends on the model; calibrate bytes_per_pixel for yours
+            max_tile_pixels = min(max_tile_pixels, int(memory_budget_mb * 1024 * 1024 / bytes_per_pixel))
+
+        plan = plan_tiles(upscaled_image_width, upscaled_image_height, max_tile_pixels, alignment, overlap, max_tile_aspect)
+        return (plan["tile_width"], plan["tile_height"], plan["tile_count"], plan["overhead_pixels"],)
+
+
 class EbuGetImageAspectRatio:
-    ASPECT_RATIOS = {
-        "1:1": 1.0,
-        "6:5": 1.2,
-        "5:4": 1.25,
-        "4:3": 1.333,
-        "3:2": 1.5,
-        "2:1": 2.0,
-        "16:10": 1.6,
-        "16:9": 1.777,
-        "5:6": 0.833,
-        "4:5": 0.8,
-        "3:4": 0.75,
-        "2:3": 0.666,
-        "10:16": 0.625,
-        "9:16": 0.5625
-    }
+    ASPECT_RATIOS = aspect_ratio_registry
 
     @classmethod
     def INPUT_TYPES(cls):
@@ -145,11 +255,9 @@ class EbuGetImageAspectRatio:
         ratio = width / height
         tolerance = 0.08  # 8% tolerance
 
-        closest = min(self.ASPECT_RATIOS.items(), key=lambda x: abs(x[1] - ratio))
-        label, value = closest
-        diff = abs(value - ratio)
+        label, value, diff = self.ASPECT_RATIOS.closest(width, height)
 
-        print(f"DEBUG: width={width}, height={height}, ratio={ratio:.4f}, closest={label} ({value}), diff={diff:.4f}")
+        logger.debug("width=%d, height=%d, ratio=%.4f, closest=%s (%.4f), diff=%.4f", width, height, ratio, label, value, diff)
 
         if diff <= tolerance:
             return (label,)
@@ -158,22 +266,7 @@ class EbuGetImageAspectRatio:
 
 
 class EbuGetImageAspectRatioFromImage:
-    ASPECT_RATIOS = {
-        "1:1": 1.0,
-        "6:5": 1.2,
-        "5:4": 1.25,
-        "4:3": 1.333,
-        "3:2": 1.5,
-        "2:1": 2.0,
-        "16:10": 1.6,
-        "16:9": 1.777,
-        "5:6": 0.833,
-        "4:5": 0.8,
-        "3:4": 0.75,
-        "2:3": 0.666,
-        "10:16": 0.625,
-        "9:16": 0.5625
-    }
+    ASPECT_RATIOS = aspect_ratio_registry
 
     @classmethod
     def INPUT_TYPES(cls):
@@ -199,11 +292,9 @@ class EbuGetImageAspectRatioFromImage:
         ratio = width / height
 
         # Find the closest aspect ratio from the predefined list
-        closest = min(self.ASPECT_RATIOS.items(), key=lambda x: abs(x[1] - ratio))
-        label, value = closest
-        diff = abs(value - ratio)
+        label, value, diff = self.ASPECT_RATIOS.closest(width, height)
 
-        print(f"DEBUG: width={width}, height={height}, ratio={ratio:.4f}, closest={label} ({value}), diff={diff:.4f}")
+        logger.debug("width=%d, height=%d, ratio=%.4f, closest=%s (%.4f), diff=%.4f", width, height, ratio, label, value, diff)
 
         resolution_str = f"{width}{delimiter}{height}"
 
@@ -225,6 +316,11 @@ class EbuUniqueFileName:
                 "str": ("STRING", {"default": "file"}),
                 "join_str": ("STRING", {"default": "-"}),
                 "seed": ("INT", {"default": 0, "max": 0xffffffffffffffff})
+            },
+            "optional": {
+                "precision": (PRECISIONS, {"default": "seconds"}),
+                "add_worker_id": ("BOOLEAN", {"default": False}),
+                "add_counter": ("BOOLEAN", {"default": False}),
             }
         }
 
@@ -233,9 +329,15 @@ class EbuUniqueFileName:
     FUNCTION = "generate_filename"
     CATEGORY = "Utility"
 
-    def generate_filename(self, str, join_str, seed):
-        now = datetime.now().strftime("%Y_%m_%d_%H_%M_%S")
-        return (f"{str}{join_str}{now}",)
+    @classmethod
+    def IS_CHANGED(cls, **kwargs):
+        # A new timestamp every run; never reuse a cached name
+        return float("nan")
+
+    def generate_filename(self, str, join_str, seed, precision="seconds", add_worker_id=False, add_counter=False):
+        # The worker id and per-process counter make names unique across
+        # workers and within one timestamp without listing the output folder
+        return (shared_names.name(str, join_str, precision, add_worker_id, add_counter),)
 
 class EbuAppendToFile:
     @classmethod
@@ -246,6 +348,9 @@ class EbuAppendToFile:
                 "directory_name": ("STRING", {"default": "store"}),
                 "file_name": ("STRING", {"default": "output.txt"}),
                 "overwrite": ("BOOLEAN", {"default": False})
+            },
+            "optional": {
+                "buffered": ("BOOLEAN", {"default": False}),
             }
         }
 
@@ -254,17 +359,45 @@ class EbuAppendToFile:
     OUTPUT_NODE = True
     CATEGORY = "Utility"
 
-    def append_to_file(self, string_to_append, directory_name, file_name, overwrite):
-        os.makedirs(directory_name, exist_ok=True)
+    def append_to_file(self, string_to_append, directory_name, file_name, overwrite, buffered=False):
         full_path = os.path.join(directory_name, file_name)
 
-        mode = 'w' if overwrite else 'a'
-        with open(full_path, mode) as file:
-            file.write(string_to_append + "\n")
+        if buffered:
+            # Queue the line on the shared writer; it reaches disk on the next
+            # size/time flush, when the file is read here, or at exit.
+            shared_writer.write(full_path, string_to_append + "\n", overwrite=overwrite)
+            return ()
 
-        print(f"{'Overwritten' if overwrite else 'Appended to'} file: {full_path}")
+        os.makedirs(directory_name, exist_ok=True)
+        # Keep ordering with anything still queued from buffered appends
+        shared_writer.flush(full_path)
+        data = (string_to_append + "\n").encode("utf-8")
+        with locked(full_path):
+            if overwrite:
+                atomic_write(full_path, data)
+            else:
+                with open(full_path, 'ab') as file:
+                    file.write(data)
+                instrumentation.add("bytes_written", len(data))
+        # An append grows the file, which cached entries detect by themselves,
+        # and cached indexes then only scan the new tail, so only a rewrite
+        # needs invalidating
+        if overwrite:
+            shared_cache.invalidate(full_path)
+
+        logger.debug("%s file: %s", "Overwritten" if overwrite else "Appended to", full_path)
         return ()
 
+class EbuAppendToFileAsync(EbuAppendToFile):
+    """
+    EbuAppendToFile as an async node: the write runs on the shared I/O pool,
+    so slow (e.g. network) disks don't hold up the rest of the prompt.
+    """
+    FUNCTION = "append_to_file_async"
+
+    async def append_to_file_async(self, **kwargs):
+        return await run_io(self.append_to_file, **kwargs)
+
 class EbuReadFromFile:
     @classmethod
     def INPUT_TYPES(cls):
@@ -272,27 +405,85 @@ class EbuReadFromFile:
             "required": {
                 "directory_name": ("STRING", {"default": "store"}),
                 "file_name": ("STRING", {"default": "output.txt"})
+            },
+            "optional": {
+                "read_mode": (cls.READ_MODES, {"default": "whole file"}),
+                "line_count": ("INT", {"default": 10, "min": 0, "max": 1000000}),
+                "start": ("INT", {"default": 0, "min": 0, "max": 0xffffffffffff}),
+                "end": ("INT", {"default": -1, "min": -1, "max": 0xffffffffffff}),
+                "seed": ("INT", {"default": 0, "max": 0xffffffffffffffff})
             }
         }
 
+    # "last lines" uses line_count, "line range" and "byte range" read
+    # [start, end) with end -1 meaning the end of the file, "random line"
+    # picks one line with seed.
+    READ_MODES = ["whole file", "last lines", "line range", "random line", "byte range"]
+
     RETURN_TYPES = ("STRING",)
     RETURN_NAMES = ("file_contents",)
     FUNCTION = "read_from_file"
     OUTPUT_NODE = True
     CATEGORY = "Utility"
 
-    def read_from_file(self, directory_name, file_name):
+    @classmethod
+    def IS_CHANGED(cls, directory_name=None, file_name=None, **kwargs):
+        return store_file_fingerprint(directory_name, file_name)
+
+    def read_from_file(self, directory_name, file_name, read_mode="whole file", line_count=10, start=0, end=-1, seed=0):
         full_path = os.path.join(directory_name, file_name)
 
-        if not os.path.exists(full_path):
-            print(f"File not found: {full_path}")
+        if not os.path.exists(full_path) and not shared_writer.pending(full_path):
+            logger.warning("File not found: %s", full_path)
             return ("",)
 
+        shared_writer.flush(full_path)
+        hits = shared_cache.hits
+        with locked(full_path, exclusive=False):
+            if read_mode == "whole file":
+                contents = shared_cache.get_or_load(full_path, "text", lambda: self._read(full_path))
+            elif read_mode == "byte range":
+                contents = read_byte_range(full_path, start, end)
+            else:
+                contents = self._read_lines(full_path, read_mode, line_count, start, end, seed)
+
+        logger.debug("Read from file: %s%s", full_path, " (cached)" if shared_cache.hits > hits else "")
+        return (contents,)
+
+    @staticmethod
+    def _read_lines(full_path, read_mode, line_count, start, end, seed):
+        index = EbuReadFromFile._cached_line_index(full_path)
+        with index.lock:
+            if read_mode == "last lines":
+                return index.last_lines(line_count)
+            if read_mode == "line range":
+                return index.read_lines(start, end)
+            if read_mode == "random line":
+                return index.line(random.Random(seed).randrange(len(index))) if len(index) else ""
+        raise ValueError(f"Unknown read_mode: {read_mode}")
+
+    @staticmethod
+    def _cached_line_index(full_path) -> LineIndex:
+        # After an append, the cached index only scans the new tail of the file
+        return shared_cache.get_or_load(full_path, "line_index", lambda: load_line_index(full_path),
+                                        sizeof=lambda index: index.nbytes(), refresher=LineIndex.refresh)
+
+    @staticmethod
+    def _read(full_path):
         with open(full_path, 'r') as file:
-            contents = file.read()
+            instrumentation.add("bytes_read", os.fstat(file.fileno()).st_size)
+            return file.read()
 
-        print(f"Read from file: {full_path}")
-        return (contents,)
+class EbuReadFromFileAsync(EbuReadFromFile):
+    """
+    EbuReadFromFile as an async node: the read runs on the shared I/O pool,
+    so independent reads in one prompt overlap with each other and with
+    other work.
+    """
+    FUNCTION = "read_from_file_async"
+
+    async def read_from_file_async(self, **kwargs):
+        return await run_io(self.read_from_file, **kwargs)
 
 class EbuFileListCache:
     @classmethod
@@ -305,83 +496,120 @@ class EbuFileListCache:
                 "input_items":    ("STRING", {"multiline": True}),
                 "limit_list_size": ("INT", {"default": 100, "min": 1, "max": 10000}),
                 "seed":           ("INT", {"default": 0, "max": 0xffffffffffffffff})
+            },
+            "optional": {
+                "draw_mode":      (["random", "cursor"], {"default": "random"}),
+                "store_format":   (cls.STORE_FORMATS, {"default": "text file"}),
             }
         }
 
+    STORE_FORMATS = ["text file", "database"]
+
     RETURN_TYPES = ("STRING", "STRING", "STRING")
     RETURN_NAMES = ("selected_items", "input_items", "combined_items")
     FUNCTION = "process_file_list_cache"
     OUTPUT_NODE = True
     CATEGORY = "Utility"
 
+    @classmethod
+    def IS_CHANGED(cls, directory_name=None, file_name=None, draw_mode="random", store_format="text file", **kwargs):
+        if draw_mode == "cursor":
+            # Every run advances the cursor, so the output changes every time
+            return float("nan")
+        if store_format == "database":
+            if directory_name is None or file_name is None:
+                return float("nan")
+            return f"{DATABASE_NAME}:{open_database(directory_name).version(file_name)}"
+        # Same inputs + same seed + same file contents always give the same output
+        return store_file_fingerprint(directory_name, file_name)
+
     def process_file_list_cache(self,
                                 directory_name: str,
                                 file_name: str,
                                 num_return_items: int,
                                 input_items: str,
                                 limit_list_size: int,
-                                seed: Optional[int] = None
+                                seed: Optional[int] = None,
+                                draw_mode: str = "random",
+                                store_format: str = "text file"
                                 ) -> List[str]:
         """
         Reads directory_name/file_name, merges any new lines from input_items,
-        shuffles & trims to limit_list_size, optionally rewrites the file,
+        compacts the pool back to limit_list_size once it outgrows it,
         then returns a random sample of num_return_items.
+
+        Runs hold a lock on the file (shared when only sampling, exclusive
+        when adding), so several workers can share one store directory.
+        New lines are appended to the file and tracked in a ``.idx`` hash
+        index beside it, so a run only touches the lines it adds. The file is
+        shuffled, trimmed and rewritten (with a ``.bk`` backup) only when the
+        pool grows past limit_list_size by more than COMPACTION_SLACK.
+        Sampling draws positions from the index and reads only those lines.
+
+        All randomness comes from a private random.Random(seed), so the same
+        seed gives the same result and the process-global random module is
+        never reseeded.
+
+        With draw_mode "cursor", items are instead handed out in a stored
+        seeded order (see DrawCursor), so no item repeats until every item
+        has been returned once.
+
+        With store_format "database", the pool is instead the list named
+        file_name in the directory's shared ListDatabase (see
+        _process_database).
         """
+        if store_format == "database":
+            return self._process_database(directory_name, file_name, num_return_items, input_items,
+                                          limit_list_size, seed, draw_mode)
+
         # Ensure storage directory exists
         os.makedirs(directory_name, exist_ok=True)
-        full_path   = os.path.join(directory_name, file_name)
-        backup_path = full_path + ".bk"
-
-        # 1. Load existing lines
-        current_lines = set()
-        if os.path.exists(full_path):
-            with open(full_path, "r", encoding="utf-8") as f:
-                current_lines = {line.strip() for line in f if line.strip()}
+        full_path = os.path.join(directory_name, file_name)
+        shared_writer.flush(full_path)
+        rng = random.Random(seed)
 
-        # 2. If no new input → just sample & return, no file changes
+        # 1. If no new input → just sample & return, no file changes
         if not input_items.strip():
-            selected = random.sample(
-                list(current_lines),
-                min(num_return_items, len(current_lines))
-            )
+            with locked(full_path, exclusive=False):
+                if draw_mode == "cursor":
+                    selected = self._draw(full_path, self._load_store(full_path), num_return_items, seed)
+                elif os.path.exists(full_path) and os.path.getsize(full_path) > STREAM_SAMPLE_BYTES:
+                    # Too big to index: stream the file once, keeping only the sample
+                    selected = reservoir_sample(full_path, num_return_items, rng)
+                else:
+                    selected = self._load_store(full_path).sample(num_return_items, rng)
             return (
                 "\n".join(selected),
                 "",                         # no input_items
                 "\n".join(selected)         # combined == selected
             )
 
-        # 3. Parse & merge new input lines
-        input_lines = [
-            line.strip()
-            for line in input_items.splitlines()
-            if line.strip()
-        ]
-        input_set = set(input_lines)
-
-        # 4. Combine, optionally reseed, then shuffle
-        combined = current_lines.union(input_set)
-        combined_list = list(combined)
-        if seed is not None:
-            random.seed(seed)
-        random.shuffle(combined_list)
-
-        # 5. Trim to limit_list_size
-        trimmed = combined_list[:limit_list_size]
-
-        # 6. Backup old file & rewrite with trimmed list
-        if os.path.exists(full_path):
-            shutil.copy2(full_path, backup_path)
-        with open(full_path, "w", encoding="utf-8") as f:
-            f.write("\n".join(trimmed) + "\n")
-
-        # 7. From the trimmed list, pick new random sample (excluding the inputs)
-        available = list(set(trimmed) - input_set)
-        selected  = random.sample(
-            available,
-            min(num_return_items, len(available))
-        )
+        # 2. Parse new input lines
+        input_lines = parse_list_items(input_items)
+        input_hashes = {item_hash(line) for line in input_lines}
+
+        with locked(full_path):
+            # 3. Load the index of existing lines (reused from memory if the file is unchanged)
+            store = self._load_store(full_path)
 
-        # 8. Build the combined output (inputs first, then selected)
+            # 4. Append the lines the store doesn't have yet
+            try:
+                store.extend(input_lines)
+
+                # 5. Compact back down to limit_list_size if the pool has outgrown it
+                store.trim(limit_list_size, rng)
+            except Exception:
+                shared_cache.invalidate(full_path)
+                raise
+            shared_cache.put(full_path, "list_store", store, store.nbytes())
+
+            # 6. From the pool, pick a random sample (excluding the inputs)
+            if draw_mode == "cursor":
+                selected = self._draw(full_path, store, num_return_items, seed, input_hashes)
+            else:
+                selected = store.sample(num_return_items, rng, exclude_hashes=input_hashes)
+
+        # 7. Build the combined output (inputs first, then selected)
         combined_output = input_lines + selected
 
         return (
@@ -390,6 +618,185 @@ class EbuFileListCache:
             "\n".join(combined_output)
         )
 
+    @staticmethod
+    def _process_database(directory_name, file_name, num_return_items, input_items, limit_list_size, seed, draw_mode):
+        """
+        Same steps as the text format, in one transaction on
+        directory_name/lists.sqlite. The first time a list is used, an
+        existing text file of the same name is imported into it, so a
+        workflow can switch formats without losing its pool.
+        """
+        check_list_name(file_name)
+        db = open_database(directory_name)
+        text_path = os.path.join(directory_name, file_name)
+        if os.path.isfile(text_path) and not db.exists(file_name):
+            shared_writer.flush(text_path)
+            db.import_text(file_name, text_path, if_missing=True)
+
+        rng = random.Random(seed)
+        input_lines = parse_list_items(input_items)
+        input_hashes = {item_hash(line) for line in input_lines}
+        # Only sampling from the pool needs no write lock
+        with db.transaction(write=bool(input_lines) or draw_mode == "cursor") as lists:
+            if input_lines:
+                lists.extend(file_name, input_lines)
+                lists.trim(file_name, limit_list_size, rng)
+            if draw_mode == "cursor":
+                selected = lists.draw(file_name, num_return_items, seed or 0, input_hashes)
+            else:
+                selected = lists.sample(file_name, num_return_items, rng, exclude_hashes=input_hashes)
+
+        return (
+            "\n".join(selected),
+            "\n".join(input_lines),
+            "\n".join(input_lines + selected)
+        )
+
+    @staticmethod
+    def _draw(full_path: str, store: ListStore, k: int, seed: Optional[int], exclude_hashes=()) -> List[str]:
+        if not len(store):
+            # Empty or missing pool: nothing to draw, and no cursor to create
+            return []
+        cursor = DrawCursor(full_path)
+        # Drawing moves the cursor, so it needs its own exclusive lock even for readers of the store
+        with locked(cursor.cursor_path), store.lock:
+            return store.read_items(cursor.draw(store, k, seed or 0, exclude_hashes))
+
+    @staticmethod
+    def _load_store(full_path: str) -> ListStore:
+        if not os.path.exists(full_path):
+            return ListStore(full_path)
+        # A pool another worker appended to is brought up to date from its tail
+        return shared_cache.get_or_load(full_path, "list_store", ListStore(full_path).load, ListStore.nbytes,
+                                        refresher=ListStore.refresh)
+
+class EbuFileListCacheAsync(EbuFileListCache):
+    """EbuFileListCache as an async node, running on the shared I/O pool."""
+    FUNCTION = "process_file_list_cache_async"
+
+    async def process_file_list_cache_async(self, **kwargs):
+        return await run_io(self.process_file_list_cache, **kwargs)
+
+class EbuListDatabase:
+    """
+    Moves lists between a store directory's text files and its
+    lists.sqlite database, or takes a backup of the database.
+    """
+    ACTIONS = ["backup", "import text files", "export text files"]
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "directory_name": ("STRING", {"default": "store"}),
+                "action": (cls.ACTIONS, {"default": "backup"}),
+                "list_names": ("STRING", {"multiline": True, "default": ""}),
+            }
+        }
+
+    RETURN_TYPES = ("STRING",)
+    RETURN_NAMES = ("report",)
+    FUNCTION = "run"
+    OUTPUT_NODE = True
+    CATEGORY = "Utility"
+
+    def run(self, directory_name, action, list_names):
+        """
+        Import or export the lists named in list_names (one per line). A
+        list is stored in a text file of the same name. A blank list_names
+        imports every .txt file of the directory; export always needs the
+        names, since it overwrites those files. Backup copies the database
+        to lists.sqlite.bk.
+
+        Like any cached node, the action runs again only when an input
+        changes, not on every queue.
+        """
+        db = open_database(directory_name)
+        names = [check_list_name(name) for name in parse_list_items(list_names)]
+        report = []
+        if action == "import text files":
+            if not names and os.path.isdir(directory_name):
+                names = sorted(name for name in os.listdir(directory_name) if name.endswith(".txt"))
+            for name in names:
+                path = os.path.join(directory_name, name)
+                shared_writer.flush(path)
+                report.append(f"{name}: {db.import_text(name, path)} items imported")
+        elif action == "export text files":
+            if not names:
+                raise ValueError("Export overwrites text files: name the lists to export in list_names")
+            for name in names:
+                path = os.path.join(directory_name, name)
+                shared_writer.flush(path)
+                with locked(path):
+                    count = db.export_text(name, path)
+                shared_cache.invalidate(path)
+                report.append(f"{name}: {count} items exported")
+        elif action == "backup":
+            backup_path = os.path.join(directory_name, DATABASE_NAME + ".bk")
+            db.backup(backup_path)
+            report.append(f"Backed up to {backup_path}")
+        else:
+            raise ValueError(f"Unknown action: {action}")
+        logger.info("EBU List Database: %s", "; ".join(report))
+        return ("\n".join(report),)
+
+class EbuListDatabaseSample:
+    """
+    Samples several lists of a store directory's lists.sqlite in a single
+    read transaction, so they all come from the same snapshot.
+    """
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "directory_name": ("STRING", {"default": "store"}),
+                "list_names": ("STRING", {"multiline": True, "default": ""}),
+                "num_return_items": ("INT", {"default": 1, "min": 0, "max": 1000}),
+                "seed": ("INT", {"default": 0, "max": 0xffffffffffffffff}),
+            }
+        }
+
+    RETURN_TYPES = ("STRING",)
+    RETURN_NAMES = ("selected_items",)
+    FUNCTION = "sample"
+    CATEGORY = "Utility"
+
+    @classmethod
+    def IS_CHANGED(cls, directory_name=None, list_names=None, **kwargs):
+        if directory_name is None or list_names is None:
+            return float("nan")
+        db = open_database(directory_name)
+        with db.transaction() as lists:
+            return ",".join(str(lists.version(name)) for name, _ in cls.parse_requests(list_names, 0))
+
+    @staticmethod
+    def parse_requests(list_names, num_return_items):
+        """(list name, item count) for each line: "name", or "name: count" to override num_return_items."""
+        requests = []
+        for line in parse_list_items(list_names):
+            name, _, count = line.rpartition(":")
+            if name and count.strip().isdigit():
+                requests.append((name.strip(), int(count)))
+            else:
+                requests.append((line, num_return_items))
+        return requests
+
+    def sample(self, directory_name, list_names, num_return_items, seed):
+        """
+        list_names has one list per line, optionally as "name: count" to
+        take count items from that list instead of num_return_items.
+        Returns the items of every list in order, one per line.
+        """
+        requests = self.parse_requests(list_names, num_return_items)
+        rng = random.Random(seed)
+        selected = []
+        with open_database(directory_name).transaction() as lists:
+            for name, count in requests:
+                if not lists.exists(name):
+                    logger.warning("List not found in %s: %s", directory_name, name)
+                selected.extend(lists.sample(name, count, rng))
+        return ("\n".join(selected),)
+
 class EbuEncodeNewLines:
     @classmethod
     def INPUT_TYPES(cls):
@@ -397,6 +804,9 @@ class EbuEncodeNewLines:
             "required": {
                 "text": ("STRING", {"multiline": True}),
                 "new_line_encoding": ("STRING", {"default": "|||"})
+            },
+            "optional": {
+                "escaped": ("BOOLEAN", {"default": False}),
             }
         }
 
@@ -406,8 +816,9 @@ class EbuEncodeNewLines:
     OUTPUT_NODE = True
     CATEGORY = "Utility"
 
-    def encode(self, text, new_line_encoding):
-        encoded = text.replace("\n", new_line_encoding)
+    def encode(self, text, new_line_encoding, escaped=False):
+        # escaped: reversible even if text already contains new_line_encoding
+        encoded = encode_newlines([text], new_line_encoding, escaped)[0]
         return (encoded,)
 
 class EbuDecodeNewLines:
@@ -417,6 +828,9 @@ class EbuDecodeNewLines:
             "required": {
                 "encoded_text": ("STRING",),
                 "new_line_encoding": ("STRING", {"default": "|||"})
+            },
+            "optional": {
+                "escaped": ("BOOLEAN", {"default": False}),
             }
         }
 
@@ -426,69 +840,233 @@ class EbuDecodeNewLines:
     OUTPUT_NODE = True
     CATEGORY = "Utility"
 
-    def decode(self, encoded_text, new_line_encoding):
-        decoded = encoded_text.replace(new_line_encoding, "\n")
+    def decode(self, encoded_text, new_line_encoding, escaped=False):
+        decoded = decode_newlines([encoded_text], new_line_encoding, escaped)[0]
         return (decoded,)
 
-class EbuStringWaitForImage:
+class EbuEncodeNewLinesBatch:
+    """
+    Encodes a whole list of texts in one execution, one output per input.
+    Escaped encoding (the default here) can always be decoded back exactly.
+    """
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "text": ("STRING", {"multiline": True}),
+                "new_line_encoding": ("STRING", {"default": "|||"}),
+                "escaped": ("BOOLEAN", {"default": True}),
+            }
+        }
+
+    INPUT_IS_LIST = True
+    RETURN_TYPES = ("STRING",)
+    RETURN_NAMES = ("encoded_text",)
+    OUTPUT_IS_LIST = (True,)
+    FUNCTION = "encode"
+    CATEGORY = "Utility"
+
+    def encode(self, text, new_line_encoding, escaped):
+        return (encode_newlines(text, new_line_encoding[0], escaped[0]),)
+
+class EbuDecodeNewLinesBatch:
+    """Decodes a whole list of texts encoded by EBU Encode New Lines (Batch)."""
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "encoded_text": ("STRING",),
+                "new_line_encoding": ("STRING", {"default": "|||"}),
+                "escaped": ("BOOLEAN", {"default": True}),
+            }
+        }
+
+    INPUT_IS_LIST = True
+    RETURN_TYPES = ("STRING",)
+    RETURN_NAMES = ("decoded_text",)
+    OUTPUT_IS_LIST = (True,)
+    FUNCTION = "decode"
+    CATEGORY = "Utility"
+
+    def decode(self, encoded_text, new_line_encoding, escaped):
+        return (decode_newlines(encoded_text, new_line_encoding[0], escaped[0]),)
+
+class EbuEncodeFileToStore:
+    """
+    Streams a large text file of multi-line records into a list store (as
+    used by EBU File List Cache), one encoded record per line, without
+    loading the file into memory. Records already in the store are skipped.
+    """
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "source_path": ("STRING", {"default": ""}),
+                "directory_name": ("STRING", {"default": "store"}),
+                "file_name": ("STRING", {"default": "output.txt"}),
+                "new_line_encoding": ("STRING", {"default": "|||"}),
+                "record_separator": ("STRING", {"default": "\\n\\n"}),
+                "escaped": ("BOOLEAN", {"default": True}),
+            }
+        }
+
+    RETURN_TYPES = ("INT",)
+    RETURN_NAMES = ("added_count",)
+    FUNCTION = "encode_file"
+    OUTPUT_NODE = True
+    CATEGORY = "Utility"
+
+    @classmethod
+    def IS_CHANGED(cls, source_path=None, directory_name=None, file_name=None, **kwargs):
+        if source_path is None:
+            return float("nan")
+        try:
+            source = "{}-{}-{}".format(*file_signature(source_path))
+        except FileNotFoundError:
+            source = ""
+        return f"{source}/{store_file_fingerprint(directory_name, file_name)}"
+
+    def encode_file(self, source_path, directory_name, file_name, new_line_encoding, record_separator, escaped):
+        # "\n" in the separator widget stands for a newline; the default splits on blank lines
+        separator = record_separator.replace("\\n", "\n")
+        if not separator:
+            raise ValueError("record_separator must not be empty")
+        full_path = os.path.join(directory_name, file_name)
+        shared_writer.flush(full_path)
+        try:
+            added = encode_file_to_store(source_path, full_path, new_line_encoding, separator, escaped)
+        finally:
+            shared_cache.invalidate(full_path)
+        logger.info("Encoded %d new records from %s into %s", added, source_path, full_path)
+        return (added,)
+
+class AnyType(str):
+    """A type string that matches every other type when ComfyUI validates links."""
+    def __ne__(self, other):
+        return False
+
+any_type = AnyType("*")
+
+
+def gate_open(value):
+    """A gate is open once its input has produced something non-empty."""
+    if value is None:
+        return False
+    try:
+        return len(value) > 0
+    except TypeError:
+        return True
+
+
+class EbuWaitFor:
+    """
+    Passes ``value`` through once its gates are open: all connected gates,
+    or any one of them. Inputs are lazy, so gates are only evaluated as
+    needed (one at a time in "any" mode, stopping at the first open one) and
+    ``value`` only after the gates, which lets it sequence any part of a
+    workflow after another.
+    """
+    VALUE_INPUT = "value"
+    GATE_INPUTS = ("gate_1", "gate_2", "gate_3", "gate_4")
+    CLOSED_MESSAGE = "Gate not ready. Cannot proceed."
+
     @classmethod
     def INPUT_TYPES(cls):
         return {
             "required": {
-                "input_string": ("STRING", {"multiline": True}),
-                "wait_for_image": ("IMAGE",),
+                "value": (any_type, {"lazy": True}),
+                "mode": (["all", "any"], {"default": "all"}),
+            },
+            "optional": {gate: (any_type, {"lazy": True}) for gate in cls.GATE_INPUTS},
+        }
+
+    RETURN_TYPES = (any_type,)
+    RETURN_NAMES = ("value",)
+    FUNCTION = "wait"
+    CATEGORY = "Utility"
+
+    def check_lazy_status(self, mode="all", **kwargs):
+        # Unconnected gates are absent; connected ones not evaluated yet are None
+        gates = [gate for gate in self.GATE_INPUTS if gate in kwargs]
+        pending = [gate for gate in gates if kwargs[gate] is None]
+        if mode == "any":
+            if gates and not any(gate_open(kwargs[gate]) for gate in gates):
+                # Try the next gate; with none left, don't evaluate value just to fail
+                return pending[:1]
+        elif pending:
+            return pending
+        if kwargs.get(self.VALUE_INPUT) is None:
+            return [self.VALUE_INPUT]
+        return []
+
+    def wait(self, mode="all", **kwargs):
+        gates = [gate_open(kwargs[gate]) for gate in self.GATE_INPUTS if gate in kwargs]
+        if gates and not (any(gates) if mode == "any" else all(gates)):
+            raise ValueError(self.CLOSED_MESSAGE)
+        return (kwargs.get(self.VALUE_INPUT),)
+
+class EbuStringWaitForImage(EbuWaitFor):
+    VALUE_INPUT = "input_string"
+    GATE_INPUTS = ("wait_for_image",)
+    CLOSED_MESSAGE = "Image not loaded. Cannot proceed."
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "input_string": ("STRING", {"multiline": True, "lazy": True}),
+                "wait_for_image": ("IMAGE", {"lazy": True}),
             }
         }
 
     RETURN_TYPES = ("STRING",)
     RETURN_NAMES = ("output_string",)
     FUNCTION = "passthrough"
-    CATEGORY = "Utility"
 
     def passthrough(self, input_string, wait_for_image):
-        if wait_for_image is None or len(wait_for_image) == 0:
-            raise ValueError("Image not loaded. Cannot proceed.")
-        return (input_string,)
+        return self.wait(input_string=input_string, wait_for_image=wait_for_image)
+
+class EbuImageWaitForImage(EbuWaitFor):
+    VALUE_INPUT = "input_image"
+    GATE_INPUTS = ("wait_for_image",)
+    CLOSED_MESSAGE = "Image not loaded. Cannot proceed."
 
-class EbuImageWaitForImage:
     @classmethod
     def INPUT_TYPES(cls):
         return {
             "required": {
-                "input_image": ("IMAGE",),
-                "wait_for_image": ("IMAGE",),
+                "input_image": ("IMAGE", {"lazy": True}),
+                "wait_for_image": ("IMAGE", {"lazy": True}),
             }
         }
 
     RETURN_TYPES = ("IMAGE",)
     RETURN_NAMES = ("output_image",)
     FUNCTION = "passthrough"
-    CATEGORY = "Utility"
 
     def passthrough(self, input_image, wait_for_image):
-        if wait_for_image is None or len(wait_for_image) == 0:
-            raise ValueError("Image not loaded. Cannot proceed.")
-        return (input_image,)
+        return self.wait(input_image=input_image, wait_for_image=wait_for_image)
+
+class EbuModelWaitForImage(EbuWaitFor):
+    VALUE_INPUT = "input_model"
+    GATE_INPUTS = ("wait_for_image",)
+    CLOSED_MESSAGE = "Image not loaded. Cannot proceed."
 
-class EbuModelWaitForImage:
     @classmethod
     def INPUT_TYPES(cls):
         return {
             "required": {
-                "input_model": ("MODEL",),
-                "wait_for_image": ("IMAGE",),
+                "input_model": ("MODEL", {"lazy": True}),
+                "wait_for_image": ("IMAGE", {"lazy": True}),
             }
         }
 
     RETURN_TYPES = ("MODEL",)
     RETURN_NAMES = ("output_model",)
     FUNCTION = "passthrough"
-    CATEGORY = "Utility"
 
     def passthrough(self, input_model, wait_for_image):
-        if wait_for_image is None or len(wait_for_image) == 0:
-            raise ValueError("Image not loaded. Cannot proceed.")
-        return (input_model,)
+        return self.wait(input_model=input_model, wait_for_image=wait_for_image)
 
 class EbuComputeImageUpscale:
     """
@@ -515,23 +1093,187 @@ class EbuComputeImageUpscale:
         img = image[0]
         original_height, original_width = img.shape[:2]
 
-        # Calculate upscale factors for width and height
-        upscale_by_width = 1.0
-        if min_width > 0:
-            upscale_by_width = min_width / original_width
+        return compute_upscale(original_width, original_height, min_width, min_height)
+
+class EbuUpscaleImageChunked:
+    """
+    Resizes a whole IMAGE batch to the EBU Compute Image Upscale plan on the
+    CPU, a chunk of images and a band of rows at a time so peak memory stays
+    bounded at 4K and beyond. Gives the same pixels whatever the chunking.
+    """
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "image": ("IMAGE",),
+                "min_width": ("INT", {"default": 2560, "min": 0, "max": 16384, "step": 1, "display": "number"}),
+                "min_height": ("INT", {"default": 1440, "min": 0, "max": 16384, "step": 1, "display": "number"}),
+                "method": (RESIZE_METHODS, {"default": "bilinear"}),
+                "chunk_size": ("INT", {"default": 1, "min": 0, "max": 4096, "step": 1, "display": "number"}),
+                "tile_rows": ("INT", {"default": 512, "min": 0, "max": 16384, "step": 8, "display": "number"}),
+                "precision": (COMPUTE_DTYPES, {"default": "float32"}),
+                "threads": ("INT", {"default": 0, "min": 0, "max": 64, "step": 1, "display": "number"}),
+            }
+        }
+
+    RETURN_TYPES = ("IMAGE", "FLOAT", "INT", "INT",)
+    RETURN_NAMES = ("image", "upscale_by", "upscaled_width", "upscaled_height",)
+    FUNCTION = "upscale"
+    CATEGORY = "Resolution"
+
+    def upscale(self, image, min_width, min_height, method, chunk_size, tile_rows, precision, threads):
+        # chunk_size / tile_rows of 0 mean the whole batch / whole frame at once
+        _, original_height, original_width = image.shape[:3]
+        upscale_by, upscaled_width, upscaled_height = compute_upscale(original_width, original_height, min_width, min_height)
+
+        resizer = ChunkedResizer(upscaled_width, upscaled_height, method, chunk_size, tile_rows, precision, threads)
+        return (resizer.resize(image), upscale_by, upscaled_width, upscaled_height,)
+
+class EbuGetImageAspectRatioBatch:
+    """
+    Per-image aspect ratio, resolution and dimensions for whole IMAGE batches
+    or lists of batches with mixed sizes, returned as lists so downstream
+    nodes run once per image without re-running the graph.
+    """
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "image": ("IMAGE",),
+                "delimiter": ("STRING", {"default": ":"}),
+                "tolerance": ("FLOAT", {"default": 0.08, "min": 0.0, "max": 1.0, "step": 0.01}),
+            }
+        }
+
+    INPUT_IS_LIST = True
+    RETURN_TYPES = ("STRING", "STRING", "INT", "INT",)
+    RETURN_NAMES = ("aspect_ratio", "resolution", "width", "height",)
+    OUTPUT_IS_LIST = (True, True, True, True,)
+    FUNCTION = "get_aspect_ratios"
+    CATEGORY = "Resolution"
+
+    def get_aspect_ratios(self, image, delimiter, tolerance):
+        delimiter = delimiter[0]
+        tolerance = tolerance[0]
+        dimensions = image_dimensions(image)
+
+        # Classify each distinct size once, in one vectorized pass
+        sizes = list(set(dimensions))
+        closest, _, diffs = aspect_ratio_registry.closest_many([w for w, _ in sizes], [h for _, h in sizes])
+        labels = {}
+        for dims, label, diff in zip(sizes, closest, diffs):
+            if diff > tolerance:
+                label = "custom"
+            elif delimiter != ":":
+                label = label.replace(":", delimiter)
+            labels[dims] = label
+
+        return (
+            [labels[dims] for dims in dimensions],
+            [f"{width}{delimiter}{height}" for width, height in dimensions],
+            [width for width, _ in dimensions],
+            [height for _, height in dimensions],
+        )
+
+class EbuComputeImageUpscaleBatch:
+    """
+    Per-image upscale factor and target dimensions for whole IMAGE batches
+    or lists of batches with mixed sizes, returned as lists.
+    """
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "image": ("IMAGE",),
+                "min_width": ("INT", {"default": 2560, "min": 0, "max": 16384, "step": 1, "display": "number"}),
+                "min_height": ("INT", {"default": 1440, "min": 0, "max": 16384, "step": 1, "display": "number"}),
+            }
+        }
+
+    INPUT_IS_LIST = True
+    RETURN_TYPES = ("FLOAT", "INT", "INT",)
+    RETURN_NAMES = ("upscale_by", "upscaled_width", "upscaled_height",)
+    OUTPUT_IS_LIST = (True, True, True,)
+    FUNCTION = "compute_upscales"
+    CATEGORY = "Resolution"
 
-        upscale_by_height = 1.0
-        if min_height > 0:
-            upscale_by_height = min_height / original_height
+    def compute_upscales(self, image, min_width, min_height):
+        min_width = min_width[0]
+        min_height = min_height[0]
+        dimensions = image_dimensions(image)
 
-        # The final upscale factor is the maximum of the two to satisfy both conditions
-        upscale_by = max(upscale_by_width, upscale_by_height, 1.0)
+        plans = {dims: compute_upscale(dims[0], dims[1], min_width, min_height) for dims in set(dimensions)}
 
-        # Calculate the upscaled dimensions, rounded up to the nearest integer
-        upscaled_width = math.ceil(original_width * upscale_by)
-        upscaled_height = math.ceil(original_height * upscale_by)
+        return (
+            [plans[dims][0] for dims in dimensions],
+            [plans[dims][1] for dims in dimensions],
+            [plans[dims][2] for dims in dimensions],
+        )
 
-        return (upscale_by, upscaled_width, upscaled_height,)
+class EbuAspectRatioIndex:
+    """
+    Buckets every PNG/JPEG/WebP under a folder by aspect ratio using only
+    the image headers, without decoding any pixels. Dimensions are kept in
+    a JSON index under index_directory, so later runs only read files that
+    are new or changed.
+    """
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "image_directory": ("STRING", {"default": "input"}),
+                "recursive": ("BOOLEAN", {"default": True}),
+                "aspect_ratio": ("STRING", {"default": ""}),
+                "tolerance": ("FLOAT", {"default": 0.08, "min": 0.0, "max": 1.0, "step": 0.01}),
+                "index_directory": ("STRING", {"default": "store"}),
+                "index_file_name": ("STRING", {"default": "aspect_ratio_index.json"}),
+            }
+        }
+
+    RETURN_TYPES = ("STRING", "STRING", "INT",)
+    RETURN_NAMES = ("file_paths", "summary", "count",)
+    FUNCTION = "index_aspect_ratios"
+    OUTPUT_NODE = True
+    CATEGORY = "Resolution"
+
+    @classmethod
+    def IS_CHANGED(cls, image_directory=None, recursive=True, **kwargs):
+        if image_directory is None:
+            return float("nan")
+        if not os.path.isdir(image_directory):
+            return ""
+        found = walk_images(image_directory, recursive)
+        return hashlib.sha1(repr(sorted(found.items())).encode("utf-8")).hexdigest()
+
+    def index_aspect_ratios(self, image_directory, recursive, aspect_ratio, tolerance, index_directory, index_file_name):
+        """
+        Returns the paths of the images matching aspect_ratio (all images when
+        it is empty, "custom" for those matching no ratio), one per line, plus
+        a per-ratio count summary.
+        """
+        if not os.path.isdir(image_directory):
+            logger.warning("Directory not found: %s", image_directory)
+            return ("", "", 0,)
+
+        index = scan_image_sizes(image_directory, os.path.join(index_directory, index_file_name), recursive)
+        sizes = index.sizes()
+        paths = sorted(sizes)
+        labels, _, diffs = aspect_ratio_registry.closest_many(
+            [sizes[rel][0] for rel in paths],
+            [sizes[rel][1] for rel in paths],
+        )
+        labels = [label if diff <= tolerance else "custom" for label, diff in zip(labels, diffs)]
+
+        counts = {}
+        for label in labels:
+            counts[label] = counts.get(label, 0) + 1
+        summary = "\n".join(f"{label}: {count}" for label, count in sorted(counts.items(), key=lambda x: (-x[1], x[0])))
+
+        wanted = aspect_ratio.strip()
+        matches = [os.path.join(image_directory, rel) for rel, label in zip(paths, labels) if not wanted or label == wanted]
+
+        logger.info("Indexed %d images in %s, %d matching", len(paths), image_directory, len(matches))
+        return ("\n".join(matches), summary, len(matches),)
 
 NODE_CLASS_MAPPINGS = {
     "EbuGetImageAspectRatio": EbuGetImageAspectRatio,
@@ -548,6 +1290,21 @@ NODE_CLASS_MAPPINGS = {
     "EbuModelWaitForImage": EbuModelWaitForImage,
     "EbuGetImageAspectRatioFromImage": EbuGetImageAspectRatioFromImage,
     "EbuComputeImageUpscale": EbuComputeImageUpscale,
+    "EbuGetImageAspectRatioBatch": EbuGetImageAspectRatioBatch,
+    "EbuComputeImageUpscaleBatch": EbuComputeImageUpscaleBatch,
+    "EbuAspectRatioIndex": EbuAspectRatioIndex,
+    "EbuScalingResolutionSweep": EbuScalingResolutionSweep,
+    "EbuScalingTilePlan": EbuScalingTilePlan,
+    "EbuUpscaleImageChunked": EbuUpscaleImageChunked,
+    "EbuAppendToFileAsync": EbuAppendToFileAsync,
+    "EbuReadFromFileAsync": EbuReadFromFileAsync,
+    "EbuFileListCacheAsync": EbuFileListCacheAsync,
+    "EbuWaitFor": EbuWaitFor,
+    "EbuEncodeNewLinesBatch": EbuEncodeNewLinesBatch,
+    "EbuDecodeNewLinesBatch": EbuDecodeNewLinesBatch,
+    "EbuEncodeFileToStore": EbuEncodeFileToStore,
+    "EbuListDatabase": EbuListDatabase,
+    "EbuListDatabaseSample": EbuListDatabaseSample,
 }
 
 NODE_DISPLAY_NAME_MAPPINGS = {
@@ -565,4 +1322,22 @@ NODE_DISPLAY_NAME_MAPPINGS = {
     "EbuModelWaitForImage": "EBU Model Wait For Image",
     "EbuGetImageAspectRatioFromImage": "EBU Get Image Aspect Ratio From Image",
     "EbuComputeImageUpscale": "EBU Compute Image Upscale",
+    "EbuGetImageAspectRatioBatch": "EBU Get Image Aspect Ratio (Batch)",
+    "EbuComputeImageUpscaleBatch": "EBU Compute Image Upscale (Batch)",
+    "EbuAspectRatioIndex": "EBU Aspect Ratio Index",
+    "EbuScalingResolutionSweep": "EBU Scaling Resolution Sweep",
+    "EbuScalingTilePlan": "EBU Scaling Tile Plan",
+    "EbuUpscaleImageChunked": "EBU Upscale Image (Chunked)",
+    "EbuAppendToFileAsync": "EBU Append To File (Async)",
+    "EbuReadFromFileAsync": "EBU Read From File (Async)",
+    "EbuFileListCacheAsync": "EBU File List Cache (Async)",
+    "EbuWaitFor": "EBU Wait For",
+    "EbuEncodeNewLinesBatch": "EBU Encode New Lines (Batch)",
+    "EbuDecodeNewLinesBatch": "EBU Decode New Lines (Batch)",
+    "EbuEncodeFileToStore": "EBU Encode File To Store",
+    "EbuListDatabase": "EBU List Database",
+    "EbuListDatabaseSample": "EBU List Database Sample",
 }
+
+# Time and count every node's FUNCTION (a no-op check unless EBU_METRICS is set)
+instrumentation.instrument_nodes(NODE_CLASS_MAPPINGS)
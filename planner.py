@@ -0,0 +1,203 @@
+import math
+from functools import lru_cache
+from typing import Iterable, List, Sequence, Tuple
+
+# Resolution presets offered by EbuScalingResolution, per aspect ratio.
+RESOLUTION_PRESETS = {
+    "16:9": [
+        "640x360", "960x540", "1024x576", "1088x612", "1152x648", "1216x684", "1280x720", "1344x756", "1408x792", "1472x828", "1536x864", "1600x900", "1792x1024", "1856x1044", "1920x1080", "2048x1152", "2240x1260", "2304x1296", "2560x1440"
+    ],
+    "16:10": [
+        "640x400", "704x440", "768x480", "832x520", "896x560", "960x600", "1024x640", "1088x680", "1152x720", "1216x760", "1280x800", "1344x840", "1408x880", "1472x920", "1536x960", "1600x1000", "1792x1120", "1856x1160", "1920x1200", "2048x1280", "2240x1400", "2560x1600"
+    ],
+    "3:2": [
+        "768x512", "832x554", "896x597", "960x640", "1024x682", "1088x725", "1152x768", "1216x810", "1280x853", "1344x896", "1408x938", "1472x981", "1536x1024", "1600x1066"
+    ],
+    "4:3": [
+        "640x480", "704x528", "768x576", "832x624", "896x672", "960x720", "1024x768", "1088x816", "1152x864", "1216x912", "1280x960", "1344x1008", "1408x1056", "1472x1104", "1536x1152", "1600x1200"
+    ],
+    "5:4": [
+        "640x512", "704x564", "768x615", "832x667", "896x718", "960x770", "1024x821", "1088x872", "1152x924", "1216x975", "1280x1024", "1344x1076", "1408x1128", "1472x1179", "1536x1230", "1600x1280"
+    ],
+    "6:5": [
+        "768x640", "832x693", "896x746", "960x800", "1024x853", "1088x906", "1152x960", "1216x1013", "1280x1066", "1344x1120", "1408x1173", "1472x1226", "1536x1280", "1600x1333"
+    ],
+    "1:1": [
+        "512x512", "576x576", "640x640", "704x704", "768x768", "832x832", "896x896", "960x960", "1024x1024", "1088x1088", "1152x1152", "1216x1216", "1280x1280", "1344x1344", "1408x1408", "1472x1472", "1536x1536", "1600x1600"
+    ]
+}
+
+# The presets parsed once: ratio -> {"WxH": (width, height)}
+PRESET_SIZES = {
+    ratio: {resolution: tuple(int(x) for x in resolution.split("x")) for resolution in resolutions}
+    for ratio, resolutions in RESOLUTION_PRESETS.items()
+}
+
+MODES = ("Landscape", "Profile")
+
+
+def round_up_to_multiple_of_eight(value):
+    return math.ceil(value / 8) * 8
+
+
+@lru_cache(maxsize=4096)
+def plan_resolution(width: int, height: int, mode: str, upscale_by: float) -> Tuple[int, int, int, int, float, str]:
+    """
+    Return (width, height, upscaled_width, upscaled_height, upscale_by,
+    upscaled_resolution_string) for a landscape width x height, swapped for
+    "Profile" mode. Upscaled sides are rounded up to a multiple of 8.
+    """
+    scaled_width = round_up_to_multiple_of_eight(width * upscale_by)
+    scaled_height = round_up_to_multiple_of_eight(height * upscale_by)
+
+    if mode == "Profile":
+        width, height = height, width
+        scaled_width, scaled_height = scaled_height, scaled_width
+
+    return width, height, scaled_width, scaled_height, upscale_by, f"{scaled_width}x{scaled_height}"
+
+
+def preset_size(ratio: str, resolution: str) -> Tuple[int, int]:
+    """Look up a preset, or parse "WxH" for ratio "Other"."""
+    if ratio == "Other":
+        width, height = resolution.lower().split("x")
+        return int(width), int(height)
+    return PRESET_SIZES[ratio][resolution]
+
+
+def plan_resolutions(plans: Iterable[Sequence]) -> List[Tuple[int, int, int, int, float, str]]:
+    """
+    Plan many (ratio, resolution, mode, upscale_by) combinations in one call.
+
+    ``ratio`` and ``resolution`` may be "*" to sweep every ratio / every preset
+    of the ratio; with ratio "Other", resolution is a literal "WxH".
+    """
+    results = []
+    for ratio, resolution, mode, upscale_by in plans:
+        if ratio != "*":
+            ratios = [ratio]
+        elif resolution == "*":
+            ratios = list(PRESET_SIZES)
+        else:
+            ratios = [r for r, sizes in PRESET_SIZES.items() if resolution in sizes] or [resolution]
+        for r in ratios:
+            resolutions = list(PRESET_SIZES[r]) if resolution == "*" else [resolution]
+            for res in resolutions:
+                width, height = preset_size(r, res)
+                results.append(plan_resolution(width, height, mode, float(upscale_by)))
+    return results
+
+
+def parse_plan_lines(text: str) -> List[Tuple[str, str, str, float]]:
+    """
+    Parse one "ratio resolution mode upscale_by" plan per line, e.g.
+    "16:9 1024x576 Landscape 1.5". Mode defaults to Landscape and
+    upscale_by to 1.0; blank lines and lines starting with # are skipped.
+    """
+    plans = []
+    for number, line in enumerate(text.splitlines(), 1):
+        fields = line.split()
+        if not fields or fields[0].startswith("#"):
+            continue
+        if len(fields) < 2 or len(fields) > 4:
+            raise ValueError(f"Line {number}: expected 'ratio resolution [mode] [upscale_by]', got {line!r}")
+        mode = fields[2] if len(fields) > 2 else "Landscape"
+        if mode not in MODES:
+            raise ValueError(f"Line {number}: mode must be one of {MODES}, got {mode!r}")
+        upscale_by = float(fields[3]) if len(fields) > 3 else 1.0
+        plans.append((fields[0], fields[1], mode, upscale_by))
+    return plans
+
+
+def align_up(value: int, alignment: int) -> int:
+    return -(-value // alignment) * alignment
+
+
+def _tile_count(length: int, tile: int, overlap: int) -> int:
+    """Tiles of size ``tile`` sharing ``overlap`` pixels needed to cover ``length``."""
+    return max(1, -(-(length - overlap) // (tile - overlap)))
+
+
+def _grid_sizes(length: int, alignment: int, overlap: int):
+    """Yield (count, tile_length) for each distinct aligned tiling of one side, fewest tiles first."""
+    # No tile can be shorter than this, so once it is reached more tiles can't help
+    smallest = align_up(overlap + 1, alignment)
+    previous = None
+    count = 1
+    while True:
+        tile = align_up(-(-(length + (count - 1) * overlap) // count), alignment)
+        if tile <= overlap:
+            break
+        if tile != previous:
+            yield count, tile
+            previous = tile
+        if tile <= smallest:
+            break
+        count += 1
+
+
+def plan_tiles(width: int, height: int, max_tile_pixels: int, alignment: int = 64, overlap: int = 0,
+               max_tile_aspect: float = 2.0) -> dict:
+    """
+    Choose the tile size that covers a width x height image in the fewest
+    tiles of at most max_tile_pixels each, with both sides a multiple of
+    alignment, neither side more than max_tile_aspect times the other nor
+    larger than the aligned image, and neighbouring tiles sharing
+    ``overlap`` pixels.
+
+    Ties on tile count go to the layout that processes the fewest pixels.
+    Returns tile_width, tile_height, columns, rows, tile_count,
+    processed_pixels and overhead_pixels (processed minus image pixels).
+    """
+    if width <= 0 or height <= 0:
+        raise ValueError(f"Image size must be positive, got {width}x{height}")
+    if alignment < 1:
+        raise ValueError(f"Alignment must be at least 1, got {alignment}")
+
+    columns_options = list(_grid_sizes(width, alignment, overlap))
+    rows_options = list(_grid_sizes(height, alignment, overlap))
+
+    # A tile never needs to be larger than the (aligned) image
+    max_tile_width = align_up(width, alignment)
+    max_tile_height = align_up(height, alignment)
+
+    best = None
+    for min_columns, min_tile_width in columns_options:
+        for min_rows, min_tile_height in rows_options:
+            columns, rows, tile_width, tile_height = min_columns, min_rows, min_tile_width, min_tile_height
+            # Stretch the short side if needed to respect max_tile_aspect
+            if tile_width > max_tile_aspect * tile_height:
+                tile_height = align_up(math.ceil(tile_width / max_tile_aspect), alignment)
+                rows = _tile_count(height, tile_height, overlap)
+            elif tile_height > max_tile_aspect * tile_width:
+                tile_width = align_up(math.ceil(tile_height / max_tile_aspect), alignment)
+                columns = _tile_count(width, tile_width, overlap)
+            if tile_width * tile_height > max_tile_pixels:
+                continue
+            if max(tile_width, tile_height) > max_tile_aspect * min(tile_width, tile_height):
+                continue
+            if tile_width > max_tile_width or tile_height > max_tile_height:
+                continue
+            tiles = columns * rows
+            processed = tiles * tile_width * tile_height
+            key = (tiles, processed)
+            if best is None or key < best[0]:
+                best = (key, columns, rows, tile_width, tile_height)
+            # More rows only add tiles once one fits for these columns
+            break
+
+    if best is None:
+        raise ValueError(
+            f"No {alignment}-aligned tile of at most {max_tile_pixels} pixels and aspect {max_tile_aspect} "
+            f"can cover {width}x{height} with {overlap}px overlap"
+        )
+    (tiles, processed), columns, rows, tile_width, tile_height = best
+    return {
+        "tile_width": tile_width,
+        "tile_height": tile_height,
+        "columns": columns,
+        "rows": rows,
+        "tile_count": tiles,
+        "processed_pixels": processed,
+        "overhead_pixels": processed - width * height,
+    }
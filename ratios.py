@@ -0,0 +1,105 @@
+import bisect
+import json
+import logging
+import os
+from fractions import Fraction
+from typing import Iterable, List, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ASPECT_RATIOS = (
+    "1:1", "6:5", "5:4", "4:3", "3:2", "2:1", "16:10", "16:9",
+    "5:6", "4:5", "3:4", "2:3", "10:16", "9:16",
+)
+
+# Optional JSON list of extra "W:H" labels, e.g. ["21:9", "9:21"]. Looked up in
+# EBU_ASPECT_RATIOS_FILE, or aspect_ratios.json next to this file.
+CONFIG_PATH = os.environ.get(
+    "EBU_ASPECT_RATIOS_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "aspect_ratios.json"),
+)
+
+
+def parse_ratio(label: str) -> Fraction:
+    """Parse a "W:H" label into an exact Fraction."""
+    width, height = label.split(":")
+    return Fraction(int(width), int(height))
+
+
+class RatioRegistry:
+    """
+    A fixed set of aspect ratio labels, stored as exact fractions sorted by
+    value so the closest ratio to any width/height is found with a bisect
+    instead of a scan over every label.
+    """
+
+    def __init__(self, labels: Iterable[str]):
+        entries = {}
+        for label in labels:
+            entries.setdefault(label, parse_ratio(label))
+        ordered = sorted(entries.items(), key=lambda item: item[1])
+        self.labels = [label for label, _ in ordered]
+        self.fractions = [fraction for _, fraction in ordered]
+        self.values = [float(fraction) for fraction in self.fractions]
+        self._np_values = np.array(self.values) if np is not None else None
+
+    def __len__(self):
+        return len(self.labels)
+
+    def as_dict(self) -> dict:
+        return dict(zip(self.labels, self.values))
+
+    def closest(self, width: int, height: int) -> Tuple[str, float, float]:
+        """Return (label, value, diff) of the ratio closest to width/height."""
+        ratio = width / height
+        i = bisect.bisect_left(self.values, ratio)
+        if i == len(self.values) or (i > 0 and ratio - self.values[i - 1] <= self.values[i] - ratio):
+            i -= 1
+        value = self.values[i]
+        return self.labels[i], value, abs(value - ratio)
+
+    def closest_many(self, widths: Sequence[int], heights: Sequence[int]) -> Tuple[List[str], List[float], List[float]]:
+        """
+        Classify many width/height pairs at once; returns parallel lists of
+        labels, ratio values and diffs. Uses NumPy when it is available.
+        """
+        if self._np_values is None:
+            results = [self.closest(width, height) for width, height in zip(widths, heights)]
+            return [r[0] for r in results], [r[1] for r in results], [r[2] for r in results]
+
+        ratios = np.asarray(widths, dtype=np.float64) / np.asarray(heights, dtype=np.float64)
+        values = self._np_values
+        upper = np.clip(np.searchsorted(values, ratios), 0, len(values) - 1)
+        lower = np.clip(upper - 1, 0, len(values) - 1)
+        use_lower = np.abs(ratios - values[lower]) <= np.abs(values[upper] - ratios)
+        index = np.where(use_lower, lower, upper)
+        closest = values[index]
+        return (
+            [self.labels[i] for i in index.tolist()],
+            closest.tolist(),
+            np.abs(closest - ratios).tolist(),
+        )
+
+
+def load_registry(config_path: str = CONFIG_PATH) -> RatioRegistry:
+    """Build the registry from the defaults plus any labels in config_path."""
+    labels = list(DEFAULT_ASPECT_RATIOS)
+    if os.path.exists(config_path):
+        try:
+            with open(config_path, "r", encoding="utf-8") as f:
+                extra = json.load(f)
+            for label in extra:
+                parse_ratio(label)
+            labels.extend(extra)
+        except (OSError, ValueError, TypeError, ZeroDivisionError) as e:
+            logger.warning("Ignoring aspect ratio config %s: %s", config_path, e)
+    return RatioRegistry(labels)
+
+
+# Built once at import and shared by every aspect ratio node.
+aspect_ratio_registry = load_registry()
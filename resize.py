@@ -0,0 +1,134 @@
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
+
+# torch is imported lazily so the rest of the extension loads without it.
+
+RESIZE_METHODS = ["bilinear", "bicubic", "nearest-exact"]
+COMPUTE_DTYPES = ["float32", "bfloat16", "float16"]
+
+_BICUBIC_A = -0.75  # same kernel as torch's and OpenCV's bicubic
+
+
+def _cubic(t: float) -> Tuple[float, float, float, float]:
+    a = _BICUBIC_A
+
+    def near(x):
+        return ((a + 2) * x - (a + 3)) * x * x + 1
+
+    def far(x):
+        return ((a * x - 5 * a) * x + 8 * a) * x - 4 * a
+
+    return far(t + 1), near(t), near(1 - t), far(2 - t)
+
+
+def resize_taps(in_size: int, out_size: int, method: str) -> Tuple[List[List[int]], List[List[float]]]:
+    """
+    Source indices and weights for every output position along one axis,
+    with the pixel-center (align_corners=False) mapping torch uses.
+    Returns (indices, weights), each out_size rows of equal length.
+    """
+    scale = in_size / out_size
+    indices, weights = [], []
+    for dst in range(out_size):
+        if method == "nearest-exact":
+            indices.append([min(int(math.floor((dst + 0.5) * scale)), in_size - 1)])
+            weights.append([1.0])
+        elif method == "bilinear":
+            src = max((dst + 0.5) * scale - 0.5, 0.0)
+            i0 = min(int(src), in_size - 1)
+            t = src - i0
+            indices.append([i0, min(i0 + 1, in_size - 1)])
+            weights.append([1.0 - t, t])
+        elif method == "bicubic":
+            src = (dst + 0.5) * scale - 0.5
+            i0 = math.floor(src)
+            indices.append([min(max(i0 + k, 0), in_size - 1) for k in (-1, 0, 1, 2)])
+            weights.append(list(_cubic(src - i0)))
+        else:
+            raise ValueError(f"Unknown resize method: {method}")
+    return indices, weights
+
+
+class ChunkedResizer:
+    """
+    Separable resize of an IMAGE batch ([B, H, W, C]) computed piece by
+    piece: chunks of ``chunk_size`` images, and within those, bands of
+    ``tile_rows`` output rows that only read the input rows they need.
+
+    Every output pixel is the same weighted sum of the same input pixels
+    whichever piece it is computed in, so any chunking gives exactly the
+    result of one whole-batch pass (``chunk_size=0, tile_rows=0``), while
+    temporaries stay proportional to one piece. Pieces run on a thread pool
+    and write straight into the preallocated float32 output. ``dtype`` sets
+    the precision of the intermediate math.
+    """
+
+    def __init__(self, out_width: int, out_height: int, method: str = "bilinear",
+                 chunk_size: int = 0, tile_rows: int = 0, dtype: str = "float32", max_workers: int = 0):
+        if method not in RESIZE_METHODS:
+            raise ValueError(f"method must be one of {RESIZE_METHODS}, got {method!r}")
+        if dtype not in COMPUTE_DTYPES:
+            raise ValueError(f"dtype must be one of {COMPUTE_DTYPES}, got {dtype!r}")
+        self.out_width = out_width
+        self.out_height = out_height
+        self.method = method
+        self.chunk_size = chunk_size
+        self.tile_rows = tile_rows
+        self.dtype = dtype
+        self.max_workers = max_workers or min(8, os.cpu_count() or 1)
+
+    def pieces(self, batch_size: int):
+        """(first image, last image + 1, first output row, last output row + 1) for every piece."""
+        chunk = self.chunk_size or batch_size
+        rows = self.tile_rows or self.out_height
+        for b0 in range(0, batch_size, chunk):
+            for y0 in range(0, self.out_height, rows):
+                yield b0, min(b0 + chunk, batch_size), y0, min(y0 + rows, self.out_height)
+
+    def resize(self, images):
+        import torch
+
+        batch_size, in_height, in_width, channels = images.shape
+        dtype = getattr(torch, self.dtype)
+        rows_index, rows_weight = self._taps(in_height, self.out_height, dtype)
+        cols_index, cols_weight = self._taps(in_width, self.out_width, dtype)
+        output = torch.empty((batch_size, self.out_height, self.out_width, channels), dtype=images.dtype)
+
+        def run(piece):
+            b0, b1, y0, y1 = piece
+            index = rows_index[y0:y1]
+            # Only the input rows this band samples from are converted and read
+            low, high = int(index.min()), int(index.max()) + 1
+            window = images[b0:b1, low:high].to(dtype)
+            band = self._apply(window, index - low, rows_weight[y0:y1], axis=1)
+            band = self._apply(band, cols_index, cols_weight, axis=2)
+            output[b0:b1, y0:y1] = band.to(output.dtype)
+
+        pieces = list(self.pieces(batch_size))
+        if len(pieces) == 1 or self.max_workers == 1:
+            for piece in pieces:
+                run(piece)
+        else:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                list(pool.map(run, pieces))
+        return output
+
+    def _taps(self, in_size, out_size, dtype):
+        import torch
+
+        indices, weights = resize_taps(in_size, out_size, self.method)
+        return (torch.tensor(indices, dtype=torch.long),
+                torch.tensor(weights, dtype=torch.float64).to(dtype))
+
+    @staticmethod
+    def _apply(tensor, index, weight, axis):
+        """Weighted sum of the taps along axis (1 = rows, 2 = columns) of a [B, H, W, C] tensor."""
+        shape = [1, 1, 1, 1]
+        shape[axis] = -1
+        result = None
+        for k in range(index.shape[1]):
+            term = tensor.index_select(axis, index[:, k]) * weight[:, k].reshape(shape)
+            result = term if result is None else result + term
+        return result
@@ -0,0 +1,32 @@
+"""
+Shared fixtures for the test suite. The extension is loaded the same way
+the benchmarks load it (see benchmarks/fixtures.py), so the tests run on a
+plain Python without ComfyUI.
+"""
+import importlib
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+from fixtures import PACKAGE_NAME, load_package  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def nodes():
+    return load_package()
+
+
+@pytest.fixture(scope="session")
+def package(nodes):
+    """Import a submodule of the extension by name, e.g. package("file_store")."""
+    return lambda name: importlib.import_module(f"{PACKAGE_NAME}.{name}")
+
+
+@pytest.fixture(autouse=True)
+def clear_file_cache(package):
+    # Each test gets fresh files, so nothing cached by an earlier test applies
+    package("file_cache").shared_cache.clear()
+    yield
@@ -0,0 +1,26 @@
+import random
+
+import pytest
+
+ALPHABET = ["a", "u", "0", "d", "|", "<", "b", "r", ">", "\\", "\n", "\r", "\x85", " ", "é"]
+TOKENS = ["|||", "<br>", "\\n", "\\x", "||", "0", "a", "d", "x\\"]
+
+
+@pytest.mark.parametrize("token", TOKENS)
+def test_escaped_encoding_round_trips(package, token):
+    codec = package("codec")
+    rng = random.Random(token)
+    for _ in range(2000):
+        text = "".join(rng.choice(ALPHABET) for _ in range(rng.randrange(12)))
+        encoded = codec.escape_newlines(text, token)
+        assert len(encoded.splitlines()) <= 1
+        assert codec.unescape_newlines(encoded, token) == text
+
+
+@pytest.mark.parametrize("token", ["", "\\", "\\\\", "\\\\n", "\\u", "\\u000a", "u", "uXYZ", "u000a"])
+def test_ambiguous_tokens_rejected(package, token):
+    codec = package("codec")
+    with pytest.raises(ValueError):
+        codec.escape_newlines("a\nb", token)
+    with pytest.raises(ValueError):
+        codec.unescape_newlines("a", token)
@@ -0,0 +1,93 @@
+import os
+
+import pytest
+
+
+@pytest.mark.parametrize("draw_mode", ["random", "cursor"])
+def test_read_only_run_on_missing_pool_returns_nothing(nodes, tmp_path, draw_mode):
+    result = nodes.EbuFileListCache().process_file_list_cache(str(tmp_path), "new.txt", 5, "", 100, 0, draw_mode)
+
+    assert result == ("", "", "")
+    assert not os.path.exists(tmp_path / "new.txt.cursor")
+
+
+@pytest.mark.parametrize("draw_mode", ["random", "cursor"])
+def test_read_only_run_on_empty_pool_returns_nothing(nodes, tmp_path, draw_mode):
+    (tmp_path / "empty.txt").write_text("\n\n")
+
+    result = nodes.EbuFileListCache().process_file_list_cache(str(tmp_path), "empty.txt", 5, "", 100, 0, draw_mode)
+
+    assert result == ("", "", "")
+    assert not os.path.exists(tmp_path / "empty.txt.cursor")
+
+
+def test_index_rebuilt_when_file_is_rewritten_longer(package, tmp_path):
+    file_store = package("file_store")
+    path = tmp_path / "pool.txt"
+    path.write_text("alpha\nbeta\ngamma\n")
+    file_store.ListStore(str(path)).load()
+
+    # Longer, with a newline at the old size, but not an append
+    path.write_text("aaaaa\nalpha\nbeta\ngamma\n")
+    store = file_store.ListStore(str(path)).load()
+
+    assert store.read_all() == ["aaaaa", "alpha", "beta", "gamma"]
+    assert "aaaaa" in store and "alpha" in store
+
+
+def test_index_extended_when_lines_are_appended(package, tmp_path):
+    file_store = package("file_store")
+    path = tmp_path / "pool.txt"
+    path.write_text("alpha\nbeta\n")
+    file_store.ListStore(str(path)).load()
+
+    with open(path, "a") as f:
+        f.write("gamma\nalpha\n")
+    store = file_store.ListStore(str(path)).load()
+
+    assert store.read_all() == ["alpha", "beta", "gamma"]
+    # The sidecar was brought up to date too
+    assert file_store.ListStore(str(path)).load().read_all() == ["alpha", "beta", "gamma"]
+
+
+def test_cached_pool_refreshed_after_another_worker_appends(nodes, package, tmp_path):
+    file_store = package("file_store")
+    node = nodes.EbuFileListCache()
+    node.process_file_list_cache(str(tmp_path), "pool.txt", 0, "alpha\nbeta", 100, 0)
+    cached = node._load_store(str(tmp_path / "pool.txt"))
+
+    # Another worker, with its own copy of the index, appends to the pool
+    file_store.ListStore(str(tmp_path / "pool.txt")).load().extend(["gamma", "alpha"])
+
+    refreshed = node._load_store(str(tmp_path / "pool.txt"))
+    assert refreshed is cached
+    assert refreshed.read_all() == ["alpha", "beta", "gamma"]
+    assert list(refreshed.sorted_hashes) == sorted(refreshed.hashes)
+    assert "gamma" in refreshed
+
+
+@pytest.mark.parametrize("batch", [10, 5_000])
+def test_extend_keeps_hashes_sorted_and_deduplicated(package, tmp_path, batch):
+    file_store = package("file_store")
+    store = file_store.ListStore(str(tmp_path / "pool.txt")).load()
+    store.extend([f"item {i}" for i in range(1_000)])
+
+    added = store.extend([f"item {i}" for i in range(500, 500 + batch)] + ["item 0", "new", "new"])
+
+    assert added == [f"item {i}" for i in range(1_000, 500 + batch)] + ["new"]
+    assert list(store.sorted_hashes) == sorted(store.hashes)
+    assert len(store) == len(set(store.read_all())) == max(1_000, 500 + batch) + 1
+    assert all(item in store for item in ("item 0", "new", f"item {499 + batch}"))
+
+
+def test_cursor_order_follows_seed(package, tmp_path):
+    file_store = package("file_store")
+    store = file_store.ListStore(str(tmp_path / "pool.txt")).load()
+    store.extend([f"item {i}" for i in range(50)])
+
+    fresh = file_store.DrawCursor(str(tmp_path / "fresh.txt")).draw(store, 10, seed=2)
+    cursor = file_store.DrawCursor(store.path)
+    cursor.draw(store, 10, seed=1)
+
+    assert cursor.draw(store, 10, seed=2) == fresh
+    assert cursor.draw(store, 10, seed=2) != fresh
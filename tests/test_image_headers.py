@@ -0,0 +1,49 @@
+import struct
+
+import pytest
+
+
+def png(width, height):
+    return b"\x89PNG\r\n\x1a\n" + struct.pack(">I4sII", 13, b"IHDR", width, height) + b"\x08\x02\x00\x00\x00"
+
+
+def webp_vp8x(width, height):
+    payload = b"\x00" * 4 + (width - 1).to_bytes(3, "little") + (height - 1).to_bytes(3, "little")
+    return b"RIFF" + struct.pack("<I", 4 + 8 + len(payload)) + b"WEBP" + b"VP8X" + struct.pack("<I", len(payload)) + payload
+
+
+TRUNCATED = {
+    "short.png": png(640, 480)[:18],
+    "short.webp": webp_vp8x(640, 480)[:18],
+    "short.jpg": b"\xff\xd8\xff",
+    "zero_length.jpg": b"\xff\xd8\xff\xe0\x00\x00",
+}
+
+
+def test_read_image_size(package, tmp_path):
+    image_headers = package("image_headers")
+    (tmp_path / "a.png").write_bytes(png(640, 480))
+    (tmp_path / "b.webp").write_bytes(webp_vp8x(1024, 768))
+    assert image_headers.read_image_size(str(tmp_path / "a.png")) == (640, 480)
+    assert image_headers.read_image_size(str(tmp_path / "b.webp")) == (1024, 768)
+
+
+@pytest.mark.parametrize("name", sorted(TRUNCATED))
+def test_truncated_header_is_unreadable(package, tmp_path, name):
+    image_headers = package("image_headers")
+    (tmp_path / name).write_bytes(TRUNCATED[name])
+    assert image_headers.read_image_size(str(tmp_path / name)) is None
+
+
+def test_aspect_ratio_index_skips_truncated_images(nodes, tmp_path):
+    images = tmp_path / "images"
+    images.mkdir()
+    (images / "good.png").write_bytes(png(1024, 1024))
+    for name, data in TRUNCATED.items():
+        (images / name).write_bytes(data)
+
+    paths, summary, count = nodes.EbuAspectRatioIndex().index_aspect_ratios(
+        str(images), True, "", 0.08, str(tmp_path / "store"), "index.json")
+
+    assert (paths, count) == (str(images / "good.png"), 1)
+    assert summary == "1:1: 1"
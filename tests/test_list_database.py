@@ -0,0 +1,69 @@
+import pytest
+
+
+def test_list_database_node_defaults_to_backup(nodes, tmp_path):
+    node = nodes.EbuListDatabase()
+    assert node.INPUT_TYPES()["required"]["action"][1]["default"] == "backup"
+
+    (tmp_path / "pool.txt").write_text("alpha\nbeta\n")
+    node.run(str(tmp_path), "import text files", "")
+    (tmp_path / "pool.txt").write_text("edited by hand\n")
+
+    node.run(str(tmp_path), "backup", "")
+    assert (tmp_path / "lists.sqlite.bk").exists()
+    assert (tmp_path / "pool.txt").read_text() == "edited by hand\n"
+
+
+def test_export_needs_list_names(nodes, tmp_path):
+    node = nodes.EbuListDatabase()
+    (tmp_path / "pool.txt").write_text("alpha\nbeta\n")
+    node.run(str(tmp_path), "import text files", "")
+
+    with pytest.raises(ValueError):
+        node.run(str(tmp_path), "export text files", "")
+    assert (tmp_path / "pool.txt").read_text() == "alpha\nbeta\n"
+
+    node.run(str(tmp_path), "export text files", "pool.txt")
+    assert (tmp_path / "pool.txt").read_text() == "alpha\nbeta\n"
+
+
+def test_list_database_node_is_cached_like_other_nodes(nodes):
+    # With no IS_CHANGED, ComfyUI only reruns the action when an input changes
+    assert not hasattr(nodes.EbuListDatabase, "IS_CHANGED")
+
+
+def test_database_uses_rollback_journal_by_default(package, tmp_path):
+    db = package("list_db").ListDatabase(str(tmp_path / "lists.sqlite"))
+    with db.transaction(write=True) as lists:
+        lists.extend("pool.txt", ["alpha"])
+        mode = lists.conn.execute("PRAGMA journal_mode").fetchone()[0]
+    db.close()
+
+    assert mode == "delete"
+    assert not (tmp_path / "lists.sqlite-wal").exists()
+
+
+def test_sample_node_sees_changes_to_lists_with_counts(nodes, tmp_path):
+    (tmp_path / "pool.txt").write_text("alpha\nbeta\n")
+    nodes.EbuListDatabase().run(str(tmp_path), "import text files", "")
+    sample = nodes.EbuListDatabaseSample
+    before = sample.IS_CHANGED(directory_name=str(tmp_path), list_names="pool.txt: 2")
+    assert before == sample.IS_CHANGED(directory_name=str(tmp_path), list_names="pool.txt")
+
+    nodes.EbuFileListCache().process_file_list_cache(str(tmp_path), "pool.txt", 0, "gamma", 100, 0,
+                                                     store_format="database")
+
+    assert sample.IS_CHANGED(directory_name=str(tmp_path), list_names="pool.txt: 2") != before
+
+
+def test_cursor_order_follows_seed(package, tmp_path):
+    db = package("list_db").ListDatabase(str(tmp_path / "lists.sqlite"))
+    with db.transaction(write=True) as lists:
+        lists.extend("pool.txt", [f"item {i}" for i in range(50)])
+        lists.extend("fresh.txt", [f"item {i}" for i in range(50)])
+        fresh = lists.draw("fresh.txt", 10, seed=2)
+        lists.draw("pool.txt", 10, seed=1)
+
+        assert lists.draw("pool.txt", 10, seed=2) == fresh
+        assert lists.draw("pool.txt", 10, seed=2) != fresh
+    db.close()
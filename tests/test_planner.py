@@ -0,0 +1,45 @@
+import random
+
+import pytest
+
+
+def brute_force_tiles(planner, width, height, max_tile_pixels, alignment, overlap, max_tile_aspect):
+    """(tile_count, processed_pixels) of the best layout, trying every allowed tile size."""
+    best = None
+    for tile_width in range(alignment, planner.align_up(width, alignment) + 1, alignment):
+        for tile_height in range(alignment, planner.align_up(height, alignment) + 1, alignment):
+            if tile_width <= overlap or tile_height <= overlap or tile_width * tile_height > max_tile_pixels:
+                continue
+            if max(tile_width, tile_height) > max_tile_aspect * min(tile_width, tile_height):
+                continue
+            tiles = planner._tile_count(width, tile_width, overlap) * planner._tile_count(height, tile_height, overlap)
+            key = (tiles, tiles * tile_width * tile_height)
+            if best is None or key < best:
+                best = key
+    return best
+
+
+def random_cases(count, seed):
+    rng = random.Random(seed)
+    return [
+        (rng.randrange(64, 2500), rng.randrange(64, 2500), rng.choice([4096, 16384, 65536, 262144]),
+         rng.choice([8, 16, 64]), rng.choice([0, 8, 32, 64, 128]), rng.choice([1.0, 1.5, 2.0, 4.0]))
+        for _ in range(count)
+    ]
+
+
+@pytest.mark.parametrize("case", [
+    (813, 3879, 65536, 16, 128, 2.0),
+    (1022, 2657, 4096, 8, 32, 1.0),
+    (300, 200, 4096, 1, 32, 2.0),
+    (517, 129, 2048, 1, 32, 4.0),
+] + random_cases(150, seed=0))
+def test_plan_tiles_matches_brute_force(package, case):
+    planner = package("planner")
+    expected = brute_force_tiles(planner, *case)
+    if expected is None:
+        with pytest.raises(ValueError):
+            planner.plan_tiles(*case)
+        return
+    plan = planner.plan_tiles(*case)
+    assert (plan["tile_count"], plan["processed_pixels"]) == expected
@@ -0,0 +1,43 @@
+import os
+
+
+def test_cached_line_index_refreshed_after_append(nodes, package, tmp_path):
+    reader, writer = nodes.EbuReadFromFile(), nodes.EbuAppendToFile()
+    for i in range(5):
+        writer.append_to_file(f"line {i}", str(tmp_path), "log.txt", False)
+    assert reader.read_from_file(str(tmp_path), "log.txt", "last lines", 2) == ("line 3\nline 4\n",)
+    index = reader._cached_line_index(str(tmp_path / "log.txt"))
+
+    writer.append_to_file("line 5", str(tmp_path), "log.txt", False)
+
+    assert reader.read_from_file(str(tmp_path), "log.txt", "last lines", 2) == ("line 4\nline 5\n",)
+    assert reader._cached_line_index(str(tmp_path / "log.txt")) is index
+    assert len(index) == 6
+
+
+def test_line_index_rebuilt_after_overwrite(nodes, tmp_path):
+    reader, writer = nodes.EbuReadFromFile(), nodes.EbuAppendToFile()
+    writer.append_to_file("alpha\nbeta", str(tmp_path), "log.txt", False)
+    assert reader.read_from_file(str(tmp_path), "log.txt", "line range", 0, 0, -1) == ("alpha\nbeta\n",)
+
+    writer.append_to_file("aaaaa\nalpha\nbeta", str(tmp_path), "log.txt", True)
+
+    assert reader.read_from_file(str(tmp_path), "log.txt", "line range", 0, 0, 1) == ("aaaaa\n",)
+    assert reader.read_from_file(str(tmp_path), "log.txt", "line range", 0, 0, -1) == ("aaaaa\nalpha\nbeta\n",)
+
+
+def test_line_index_rebuilt_after_same_size_rewrite(nodes, package, tmp_path):
+    line_index = package("line_index")
+    path = tmp_path / "log.txt"
+    path.write_bytes(b"ab\ncd\n")
+    reader = nodes.EbuReadFromFile()
+    assert reader.read_from_file(str(tmp_path), "log.txt", "line range", 0, 1, 2) == ("cd\n",)
+    st = os.stat(path)
+
+    # Same inode and size, different line breaks
+    with open(path, "r+b") as f:
+        f.write(b"a\nbcd\n")
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+
+    assert reader.read_from_file(str(tmp_path), "log.txt", "line range", 0, 1, 2) == ("bcd\n",)
+    assert line_index.LineIndex(str(path)).refresh().read_lines(1, 2) == "bcd\n"